@@ -1,14 +1,22 @@
+from collections import defaultdict
 from copy import deepcopy
 import csv
 from datetime import datetime, timezone
 from dateutil import parser
+from functools import lru_cache
+import hashlib
 import io
+import itertools
 import logging
+import os
+import pickle
 from pprint import pformat
 import re
 import string
+from types import MappingProxyType
 
 from mintamazontagger import category
+from mintamazontagger import VERSION
 from mintamazontagger.currency import float_usd_to_micro_usd
 from mintamazontagger.currency import micro_usd_nearly_equal
 from mintamazontagger.currency import micro_usd_to_usd_string
@@ -19,7 +27,7 @@ from mintamazontagger.my_progress import no_progress_factory
 
 logger = logging.getLogger(__name__)
 
-PRINTABLE = set(string.printable)
+NON_PRINTABLE_RE = re.compile(f'[^{re.escape(string.printable)}]')
 
 
 ORDER_HISTORY_CSV_PATTERN = re.compile(
@@ -29,6 +37,36 @@ def is_order_history_csv(zip_file_name):
     return bool(ORDER_HISTORY_CSV_PATTERN.match(zip_file_name))
 
 
+AMAZON_ITEMS_PICKLE_FMT = 'Amazon {} Items.pickle'
+
+
+def get_items_cache_path(export_zip, csv_name, cache_base_path):
+    """The cache path for a CSV within an export, keyed by mtime and size."""
+    stat = os.stat(export_zip)
+    key = hashlib.sha1(
+        f'{VERSION}|{os.path.abspath(export_zip)}|{stat.st_mtime_ns}|'
+        f'{stat.st_size}|{csv_name}'.encode()).hexdigest()
+    return os.path.join(cache_base_path, AMAZON_ITEMS_PICKLE_FMT.format(key))
+
+
+def get_items_from_cache(cache_path):
+    """Returns the cached items, or None if there is no usable cache."""
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        logger.debug(f'Ignoring unreadable Amazon cache: {e}')
+        return None
+
+
+def dump_items_to_cache(items, cache_path):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'wb') as f:
+        pickle.dump(items, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
 def rm_leading_qty(item_title):
     """Removes the '2x Item Name' from the front of an item title."""
     return re.sub(r'^\d+x ', '', item_title)
@@ -40,11 +78,16 @@ def get_title(amzn_obj, target_length):
     base_str = None
     if qty > 1:
         base_str = str(qty) + 'x'
-    # Remove non-ASCII characters from the title.
-    clean_title = ''.join(filter(lambda x: x in PRINTABLE, amzn_obj.product_name))
-    return truncate_title(clean_title, target_length, base_str)
+    return truncate_title(
+        clean_title(amzn_obj.product_name), target_length, base_str)
 
-CURRENCY_FIELD_NAMES = set([
+
+@lru_cache(maxsize=1024)
+def clean_title(title):
+    """Removes non-ASCII characters from the title."""
+    return NON_PRINTABLE_RE.sub('', title)
+
+CURRENCY_FIELD_NAMES = frozenset([
     'Unit Price',
     'Unit Price Tax',
     'Shipping Charge',
@@ -54,18 +97,18 @@ CURRENCY_FIELD_NAMES = set([
     'Shipment Item Subtotal Tax',
 ])
 
-DATE_FIELD_NAMES = set([
+DATE_FIELD_NAMES = frozenset([
     'Order Date',
     'Ship Date',
 ])
 
 # TODO: Fix quoting issue with Website".
-RENAME_FIELD_NAMES = {
+RENAME_FIELD_NAMES = MappingProxyType({
     'Carrier Name & Tracking Number': 'tracking',
     'Website"': 'website',
-}
+})
 
-MULTI_SPLIT_BY_AND = set([
+MULTI_SPLIT_BY_AND = frozenset([
     'Order Date',
     'Ship Date',
     'tracking',
@@ -76,27 +119,39 @@ def parse_from_csv_common(
         cls,
         csv_file,
         progress_label='Parse from csv',
-        progress_factory=no_progress_factory):
-    # contents = csv_file.read().decode()
-    contents = csv_file.read().decode('utf-8')
-    # Strip a leading FEFF if present.
-    if contents[0:1] == '\ufeff':
-        contents = contents[2:]
+        progress_factory=no_progress_factory,
+        num_bytes=0):
+    """Parses csv_file in one streaming pass.
 
-    num_records = sum(1 for c in contents if c == '\n') - 1
-    result = []
-    if not num_records:
-        return result
-    
-    progress = progress_factory(progress_label, num_records)
-    reader = csv.DictReader(io.StringIO(contents))
-    for raw_dict in reader:
-        result.append(cls(raw_dict))
-        progress.next()
+    num_bytes is the (uncompressed) size of csv_file, which sizes the progress;
+    without it no progress is shown.
+    """
+    contents = io.TextIOWrapper(csv_file, encoding='utf-8', newline='')
+    header = contents.readline()
+    # Strip a leading FEFF if present.
+    if header[0:1] == '\ufeff':
+        header = header[2:]
+
+    if not num_bytes:
+        progress_factory = no_progress_factory
+    progress = progress_factory(progress_label, num_bytes)
+    progress.next(len(header))
+    reader = csv.DictReader(
+        itertools.chain([header], _advance_per_line(contents, progress)))
+    result = [cls(raw_dict) for raw_dict in reader]
     progress.finish()
+    # Do not close csv_file along with the wrapper.
+    contents.detach()
     return result
 
 
+def _advance_per_line(lines, progress):
+    """Yields lines, advancing progress by the length of each."""
+    for line in lines:
+        progress.next(len(line))
+        yield line
+
+
 def pythonify_amazon_dict(raw_dict):
     keys = set(raw_dict.keys())
 
@@ -229,7 +284,7 @@ class Charge:
             i.charge = self
     
     def total_quantity(self):
-        return sum([i.quantity for i in self.items])
+        return sum(i.quantity for i in self.items)
     
     def order_id(self):
         return self.items[0].order_id
@@ -272,14 +327,14 @@ class Charge:
         return Item.sum_totals(self.items)
     
     def shipping_charge(self):
-        return sum([i.shipping_charge for i in self.items])
+        return sum(i.shipping_charge for i in self.items)
     
     def total_discounts(self):
-        return sum([i.total_discounts for i in self.items])
+        return sum(i.total_discounts for i in self.items)
     
     def total_owed(self):
         """This should be = total + shipping_charge + total_discounts."""
-        return sum([i.total_owed for i in self.items])
+        return sum(i.total_owed for i in self.items)
     
     def tracking_numbers(self):
         return list(set([items.tracking for items in self.items]))
@@ -472,6 +527,14 @@ class Charge:
         # #     result.__dict__[key] = sum([o.__dict__[key] for o in charges])
         # return result
 
+    @classmethod
+    def merge_by_order_id(cls, charges):
+        """Merges charges into one Charge per order id, in first seen order."""
+        by_oid = defaultdict(list)
+        for c in charges:
+            by_oid[c.order_id()].append(c)
+        return [cls.merge(same_oid) for same_oid in by_oid.values()]
+
     def __repr__(self):
         return (
             f'Charge ({self.order_id()}): {self.ship_dates() or self.order_dates()}'
@@ -502,21 +565,22 @@ class Item:
         self.__dict__.update(pythonify_amazon_dict(raw_dict))
 
     @classmethod
-    def parse_from_csv(cls, csv_file, progress_factory=no_progress_factory):
+    def parse_from_csv(
+            cls, csv_file, progress_factory=no_progress_factory, num_bytes=0):
         return parse_from_csv_common(
-            cls, csv_file, 'Parsing Amazon Items', progress_factory)
+            cls, csv_file, 'Parsing Amazon Items', progress_factory, num_bytes)
 
     @staticmethod
     def sum_subtotals(items):
-        return sum([i.subtotal() for i in items])
+        return sum(i.subtotal() for i in items)
     
     @staticmethod
     def sum_subtotals_tax(items):
-        return sum([i.subtotal_tax() for i in items])
+        return sum(i.subtotal_tax() for i in items)
 
     @staticmethod
     def sum_totals(items):
-        return sum([i.total() for i in items])
+        return sum(i.total() for i in items)
 
     def subtotal(self):
         return self.quantity * self.unit_price
@@ -1,4 +1,6 @@
 from datetime import datetime
+import os
+import tempfile
 import unittest
 
 from mintamazontagger import amazon
@@ -25,6 +27,51 @@ class HelperMethods(unittest.TestCase):
             amazon.parse_amazon_date('1/23/1989'),
             datetime(1989, 1, 23))
 
+    def test_clean_title(self):
+        self.assertEqual(
+            amazon.clean_title('Café Mug ™ (2 Pack)'),
+            'Caf Mug  (2 Pack)')
+        self.assertEqual(amazon.clean_title('Plain title'), 'Plain title')
+
+
+class ItemsCache(unittest.TestCase):
+    def test_round_trip_and_invalidation(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            export_zip = os.path.join(tmp_dir, 'export.zip')
+            with open(export_zip, 'wb') as f:
+                f.write(b'zip')
+            cache_dir = os.path.join(tmp_dir, 'cache')
+            cache_path = amazon.get_items_cache_path(
+                export_zip, 'a.csv', cache_dir)
+            self.assertIsNone(amazon.get_items_from_cache(cache_path))
+
+            amazon.dump_items_to_cache([item()], cache_path)
+            cached = amazon.get_items_from_cache(cache_path)
+            self.assertEqual(len(cached), 1)
+            self.assertEqual(cached[0].order_id, '123-3211232-7655671')
+
+            self.assertNotEqual(
+                cache_path,
+                amazon.get_items_cache_path(export_zip, 'b.csv', cache_dir))
+            with open(export_zip, 'ab') as f:
+                f.write(b'more')
+            self.assertNotEqual(
+                cache_path,
+                amazon.get_items_cache_path(export_zip, 'a.csv', cache_dir))
+
+
+class ChargeClass(unittest.TestCase):
+    def test_merge_by_order_id(self):
+        c1 = Charge([item(order_id='A')])
+        c2 = Charge([item(order_id='B')])
+        c3 = Charge([item(order_id='A'), item(order_id='A')])
+
+        merged = Charge.merge_by_order_id([c1, c2, c3])
+
+        self.assertEqual([c.order_id() for c in merged], ['A', 'B'])
+        self.assertEqual(merged[0].items, c1.items + c3.items)
+        self.assertIs(merged[1], c2)
+
 
 # TODO: Revive as a Charge test:
 # class OrderClass(unittest.TestCase):
@@ -1,8 +1,30 @@
 import argparse
 import os
+import sys
 
 TAGGER_BASE_PATH = os.path.join(os.path.expanduser("~"), 'MintAmazonTagger')
 
+# Interned (as is the parsed value) so choice checks and later comparisons of
+# the MFA method match by identity.
+MINT_MFA_METHODS = tuple(sys.intern(m) for m in ('sms', 'email', 'soft-token'))
+
+
+def comma_separated_filter(value):
+    """Parses a case-insensitive comma-separated filter into a lowercase tuple.
+
+    Returns None for an empty value (meaning: do not filter).
+    """
+    if not value:
+        return None
+    return tuple(sys.intern(v) for v in value.lower().split(','))
+
+
+def existing_file_path(value):
+    """Argparse type that validates a path without opening the file."""
+    if not os.path.isfile(value):
+        raise argparse.ArgumentTypeError(f'No such file: {value}')
+    return value
+
 
 def get_name_to_help_dict(parser):
     return dict([(a.dest, a.help) for a in parser._actions])
@@ -12,7 +34,7 @@ def define_common_args(parser):
     """Parseargs shared between both CLI & GUI programs."""
     # Amazon Input, as zip file:
     parser.add_argument(
-        '--amazon_export', nargs='+', type=argparse.FileType('r', encoding='utf-8'),
+        '--amazon_export', nargs='+', type=existing_file_path,
         help=('One or more Amazon Data Exports zip file (type either "Orders" or "All Data").'))
 
     # Mint creds:
@@ -24,8 +46,9 @@ def define_common_args(parser):
         help=('Mint password for login.'))
     parser.add_argument(
         '--mint_mfa_preferred_method',
-        default='sms',
-        choices=['sms', 'email', 'soft-token'],
+        type=sys.intern,
+        default=MINT_MFA_METHODS[0],
+        choices=MINT_MFA_METHODS,
         help='The preferred Mint MFA method (2factor auth codes).')
     parser.add_argument(
         '--mint_mfa_soft_token',
@@ -152,7 +175,7 @@ def define_common_args(parser):
               'shipped an order and when the payment has posted to your '
               'bank account (as per Mint\'s view).'))
     parser.add_argument(
-        '--mint_input_description_filter', type=str,
+        '--mint_input_description_filter', type=comma_separated_filter,
         default='amazon,amzn',
         help=('Only consider Mint transactions that have one of these strings '
               'in the description field. Case-insensitive comma-separated.'))
@@ -175,7 +198,7 @@ def define_common_args(parser):
               'Look for "Appears on your BANK ACCOUNT NAME statement as NOT '
               'USEFUL NAME on DATE".'))
     parser.add_argument(
-        '--mint_input_categories_filter', type=str,
+        '--mint_input_categories_filter', type=comma_separated_filter,
         help=('Only consider Mint transactions that match one of '
               'the given categories here. Comma separated list of Mint '
               'categories.'))
@@ -193,6 +216,18 @@ def define_common_args(parser):
         help=('Do not fetch categories or transactions from Mint. Use this '
               'pickled epoch instead. If coupled with --dry_run, no '
               'connection to Mint is established.'))
+    parser.add_argument(
+        '--cache_amazon_export', action='store_true',
+        default=False,
+        help=('Caches the parsed Amazon Data Export locally, so that re-runs '
+              'with the same export zip file(s) skip parsing. Off by default '
+              'to prevent storing sensitive information locally without a '
+              'user knowing it.'))
+    parser.add_argument(
+        '--amazon_cache_location', type=str,
+        default=os.path.join(TAGGER_BASE_PATH, 'Amazon Cache'),
+        help='Where to store the parsed Amazon Data Export cache.')
+
     default_pickle_path = os.path.join(TAGGER_BASE_PATH, 'Mint Backup')
     parser.add_argument(
         '--mint_pickle_location', type=str,
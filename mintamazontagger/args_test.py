@@ -0,0 +1,27 @@
+import unittest
+
+from mintamazontagger.args import comma_separated_filter
+
+
+class CommaSeparatedFilter(unittest.TestCase):
+    def test_lowercases(self):
+        self.assertEqual(
+            comma_separated_filter('Amazon,AMZN Mktp'),
+            ('amazon', 'amzn mktp'))
+
+    def test_empty(self):
+        self.assertIsNone(comma_separated_filter(''))
+        self.assertIsNone(comma_separated_filter(None))
+
+    def test_trailing_comma(self):
+        # Same as the split(',') it replaced: an empty entry is kept.
+        self.assertEqual(comma_separated_filter('amazon,'), ('amazon', ''))
+
+    def test_whitespace_is_not_stripped(self):
+        self.assertEqual(
+            comma_separated_filter(' amazon , amzn'),
+            (' amazon ', ' amzn'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,30 +7,46 @@
 
 import argparse
 import atexit
-from collections import defaultdict
 import getpass
 import logging
-import os
 from signal import signal, SIGINT
-import time
+import threading
 
-from outdated import check_outdated
-
-from mintamazontagger import amazon
-from mintamazontagger import mint
-from mintamazontagger import tagger
 from mintamazontagger import VERSION
-from mintamazontagger.args import define_cli_args, TAGGER_BASE_PATH
-from mintamazontagger.my_progress import (
-    counter_progress_cli, determinate_progress_cli, indeterminate_progress_cli)
+from mintamazontagger.args import define_cli_args
 from mintamazontagger.currency import micro_usd_to_usd_string
-from mintamazontagger.mintclient import MintClient
-from mintamazontagger.webdriver import get_webdriver
+from mintamazontagger.logs import add_file_log_handler
 
 logger = logging.getLogger(__name__)
 
+# How long to wait on exit for a PyPI version check still in flight.
+VERSION_CHECK_EXIT_TIMEOUT_SECONDS = 2
+
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Tag Mint transactions based on itemized Amazon history.')
+    define_cli_args(parser)
+    args = parser.parse_args()
+
+    if args.version:
+        print(f'mint-amazon-tagger {VERSION}\nBy: Jeff Prouty')
+        exit(0)
+
+    # Imported here so that --help and --version stay fast.
+    from mintamazontagger.version_check import BackgroundVersionCheck
+
+    # Overlap the PyPI version check with log setup & the heavier imports.
+    version_check = BackgroundVersionCheck(VERSION)
+
+    from mintamazontagger import amazon
+    from mintamazontagger import tagger
+    from mintamazontagger.my_progress import (
+        counter_progress_cli, determinate_progress_cli,
+        indeterminate_progress_cli)
+    from mintamazontagger.mintclient import MintClient
+    from mintamazontagger.webdriver import get_webdriver
+
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
     root_logger.addHandler(logging.StreamHandler())
@@ -40,54 +56,63 @@ def main():
     # For helping remote debugging, also log to file.
     # Developers should be vigilant to NOT log any PII, ever (including being
     # mindful of what exceptions might be thrown).
-    log_directory = os.path.join(TAGGER_BASE_PATH, 'Tagger Logs')
-    os.makedirs(log_directory, exist_ok=True)
-    log_filename = os.path.join(
-        log_directory, f'{time.strftime("%Y-%m-%d_%H-%M-%S")}.log')
-    file_handler = logging.FileHandler(log_filename)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s %(name)s: %(message)s'))
-    file_handler.setLevel(logging.DEBUG)
-    root_logger.addHandler(file_handler)
+    add_file_log_handler(root_logger)
 
     logger.info(f'Running version {VERSION}')
-    try:
-        is_outdated, latest_version = check_outdated(
-            'mint-amazon-tagger', VERSION)
-        if is_outdated:
-            logger.warning('Please update your version by running:\n'
-                           'pip3 install mint-amazon-tagger --upgrade\n\n')
-    except ValueError:
-        logger.error(
-            f'Version {VERSION} is newer than PyPY version')
-
-    parser = argparse.ArgumentParser(
-        description='Tag Mint transactions based on itemized Amazon history.')
-    define_cli_args(parser)
-    args = parser.parse_args()
 
-    if args.version:
-        print(f'mint-amazon-tagger {VERSION}\nBy: Jeff Prouty')
-        exit(0)
+    def log_version_check(timeout=0):
+        """Logs the version check's outcome; returns False if still pending."""
+        try:
+            outdated = version_check.result(timeout)
+            if not version_check.done():
+                return False
+            if outdated and outdated[0]:
+                logger.warning('Please update your version by running:\n'
+                               'pip3 install mint-amazon-tagger --upgrade\n\n')
+        except ValueError:
+            logger.error(
+                f'Version {VERSION} is newer than PyPY version')
+        return True
+
+    if not log_version_check():
+        # PyPI is still being asked; report the outcome on exit instead,
+        # waiting briefly for it.
+        atexit.register(log_version_check, VERSION_CHECK_EXIT_TIMEOUT_SECONDS)
 
     webdriver = None
+    prewarm_thread = None
 
     def close_webdriver():
+        # quit() (unlike close()) also ends chromedriver and the browser.
+        nonlocal webdriver
+        # Let a launch in progress finish, so its browser is quit too.
+        if prewarm_thread:
+            prewarm_thread.join()
         if webdriver:
-            webdriver.close()
+            webdriver.quit()
+            webdriver = None
 
     atexit.register(close_webdriver)
 
+    webdriver_lock = threading.Lock()
+
     def webdriver_factory():
         nonlocal webdriver
-        if webdriver:
+        with webdriver_lock:
+            if webdriver:
+                return webdriver
+            webdriver = get_webdriver(args.headless, args.session_path)
             return webdriver
-        webdriver = get_webdriver(args.headless, args.session_path)
-        return webdriver
+
+    def prewarm_webdriver():
+        try:
+            webdriver_factory()
+        except Exception as e:
+            # The factory is retried (and any error surfaced) at login.
+            logger.debug(f'Unable to pre-warm the webdriver: {e}')
 
     def sigint_handler(signal, frame):
-        if webdriver:
-            webdriver.close()
+        close_webdriver()
         logger.warning('Keyboard interrupt caught')
         exit(0)
 
@@ -107,6 +132,14 @@ def main():
         exit(1)
 
     maybe_prompt_for_mint_credentials(args)
+    if not args.pickled_epoch:
+        # Starting Chrome takes a few seconds; launch it while the export is
+        # parsed. Only once credentials are in, so a browser window can't take
+        # focus from the password prompt.
+        prewarm_thread = threading.Thread(
+            target=prewarm_webdriver, daemon=True)
+        prewarm_thread.start()
+
     results = tagger.create_updates(
         args, mint_client,
         on_critical=on_critical,
@@ -124,12 +157,7 @@ def main():
     if args.print_unmatched and results.unmatched_charges:
         logger.warning(
             'The following were not matched to Mint transactions:\n')
-        by_oid = defaultdict(list)
-        for uo in results.unmatched_charges:
-            by_oid[uo.order_id()].append(uo)
-
-        for unmatched_by_oid in by_oid.values():
-            c = amazon.Charge.merge(unmatched_by_oid)
+        for c in amazon.Charge.merge_by_order_id(results.unmatched_charges):
             print_unmatched(c)
 
     if not results.updates:
@@ -184,27 +212,52 @@ def log_amazon_stats(items, charges):
     if len(charges) == 0 or len(items) == 0:
         logger.info('\tThere were not Amazon charges/items!')
         return
-    oid = set([i.order_id for i in items])
-    logger.info(f'\n{len(oid)} total Amazon orders\n{len(charges)} payment "charges"\n{sum([i.quantity for i in items])} total items ordered')
-
-    first_order_date = min([o.transact_date() for o in charges if o.transact_date()])
-    last_order_date = max([o.transact_date() for o in charges if o.transact_date()])
+    # Accumulate everything in a single pass over items and over charges.
+    oids = set()
+    total_quantity = 0
+    item_total_sum = 0
+    min_item_total = max_item_total = None
+    for i in items:
+        oids.add(i.order_id)
+        total_quantity += i.quantity
+        item_total = i.total()
+        item_total_sum += item_total
+        if min_item_total is None or item_total < min_item_total:
+            min_item_total = item_total
+        if max_item_total is None or item_total > max_item_total:
+            max_item_total = item_total
+
+    order_total_sum = 0
+    min_order_total = max_order_total = None
+    first_order_date = last_order_date = None
+    for c in charges:
+        transact_date = c.transact_date()
+        if transact_date:
+            if first_order_date is None or transact_date < first_order_date:
+                first_order_date = transact_date
+            if last_order_date is None or transact_date > last_order_date:
+                last_order_date = transact_date
+        order_total = c.total_owed()
+        order_total_sum += order_total
+        if min_order_total is None or order_total < min_order_total:
+            min_order_total = order_total
+        if max_order_total is None or order_total > max_order_total:
+            max_order_total = order_total
+
+    logger.info(f'\n{len(oids)} total Amazon orders\n{len(charges)} payment "charges"\n{total_quantity} total items ordered')
     logger.info(f'Charges ranging from {first_order_date} to {last_order_date}')
 
-    per_item_totals = [i.total() for i in items]
-    per_order_totals = [c.total_owed() for c in charges]
-
     logger.info(
-        f'{micro_usd_to_usd_string(sum(per_order_totals))} total spend')
+        f'{micro_usd_to_usd_string(order_total_sum)} total spend')
 
     logger.info(
-        f'{micro_usd_to_usd_string(sum(per_order_totals) / len(oid))} avg '
-        f'order total (range: {micro_usd_to_usd_string(min(per_order_totals))}'
-        f' - {micro_usd_to_usd_string(max(per_order_totals))})')
+        f'{micro_usd_to_usd_string(order_total_sum / len(oids))} avg '
+        f'order total (range: {micro_usd_to_usd_string(min_order_total)}'
+        f' - {micro_usd_to_usd_string(max_order_total)})')
     logger.info(
-        f'{micro_usd_to_usd_string(sum(per_item_totals) / len(items))} avg '
-        f'item price (range: {micro_usd_to_usd_string(min(per_item_totals))}'
-        f' - {micro_usd_to_usd_string(max(per_item_totals))})')
+        f'{micro_usd_to_usd_string(item_total_sum / len(items))} avg '
+        f'item price (range: {micro_usd_to_usd_string(min_item_total)}'
+        f' - {micro_usd_to_usd_string(max_item_total)})')
 
     # if refunds:
     #     first_refund_date = min(
@@ -255,6 +308,9 @@ def log_processing_stats(stats):
 
 
 def print_unmatched(amzn_obj):
+    from mintamazontagger import amazon
+    from mintamazontagger import mint
+
     proposed_mint_desc = mint.summarize_title(
         [i.get_title() for i in amzn_obj.items],
         f"{amzn_obj.website()}: ")
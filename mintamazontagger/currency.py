@@ -1,5 +1,7 @@
 # TODO(jprouty): Add typing.
 
+from functools import lru_cache
+
 # 50 Micro dollars we'll consider equal (this allows for some
 # division/multiplication rounding wiggle room).
 MICRO_USD_EPS = 50
@@ -28,12 +30,16 @@ def float_usd_to_micro_usd(float_usd):
     return round(float_usd * 1000000)
 
 
+# Amounts repeat heavily (zero, shipping, common prices), so memoize the
+# conversions used per transaction/CSV cell.
+@lru_cache(maxsize=65536)
 def micro_usd_to_usd_string(micro_usd):
     return (
         f"{'' if micro_usd >= -5000 else '-'}$"
         f"{micro_usd_to_float_usd(abs(micro_usd)):.2f}")
 
 
+@lru_cache(maxsize=65536)
 def parse_usd_as_micro_usd(amount):
     return float_usd_to_micro_usd(parse_usd_as_float(amount))
 
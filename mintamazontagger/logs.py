@@ -0,0 +1,70 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+from mintamazontagger.args import TAGGER_BASE_PATH
+
+# Size of the log file's write buffer.
+LOG_BUFFER_BYTES = 64 * 1024
+
+
+def add_file_log_handler(logger):
+    """Logs to a new timestamped file; returns the file name.
+
+    Records are written through a buffer, which is flushed when it fills, when
+    a warning or worse is logged, on an unhandled exception, or at exit (via
+    logging.shutdown).
+    """
+    log_directory = os.path.join(TAGGER_BASE_PATH, 'Tagger Logs')
+    os.makedirs(log_directory, exist_ok=True)
+    log_filename = os.path.join(
+        log_directory, f'{time.strftime("%Y-%m-%d_%H-%M-%S")}.log')
+    file_handler = _BufferedFileHandler(log_filename)
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    file_handler.setLevel(logging.DEBUG)
+    logger.addHandler(file_handler)
+    _flush_on_unhandled_exception(file_handler)
+    return log_filename
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """A FileHandler that only flushes after a warning or worse."""
+
+    def _open(self):
+        return open(self.baseFilename, self.mode, buffering=LOG_BUFFER_BYTES,
+                    encoding=self.encoding, errors=self.errors)
+
+    def emit(self, record):
+        # Unlike StreamHandler.emit, don't flush after every record.
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+
+def _flush_on_unhandled_exception(handler):
+    """Flushes handler before reporting any unhandled exception.
+
+    PyQt6 aborts the process after an unhandled exception in a slot, which
+    skips logging.shutdown and would lose the buffered records.
+    """
+    prev_excepthook = sys.excepthook
+    prev_threading_excepthook = threading.excepthook
+
+    def excepthook(*args):
+        handler.flush()
+        prev_excepthook(*args)
+
+    def threading_excepthook(args):
+        handler.flush()
+        prev_threading_excepthook(args)
+
+    sys.excepthook = excepthook
+    threading.excepthook = threading_excepthook
@@ -10,15 +10,16 @@ import atexit
 import datetime
 from functools import partial
 import logging
+import multiprocessing
 import os
+import queue
 from signal import signal, SIGINT
 import sys
-import time
 from urllib.parse import urlencode
 import webbrowser
 
 from PyQt6.QtCore import (
-    Q_ARG, QDate, QEventLoop, Qt, QMetaObject, QObject, QTimer, QThread,
+    Q_ARG, QDate, Qt, QMetaObject, QObject, QTimer, QThread,
     QUrl, pyqtSlot, pyqtSignal)
 from PyQt6.QtGui import QDesktopServices, QKeySequence, QShortcut
 from PyQt6.QtWidgets import (
@@ -27,19 +28,14 @@ from PyQt6.QtWidgets import (
     QFormLayout, QGroupBox, QHBoxLayout, QInputDialog,
     QLabel, QLineEdit, QMainWindow, QProgressBar,
     QPushButton, QTableView, QWidget, QVBoxLayout)
-from outdated import check_outdated
 
-from mintamazontagger import amazon
-from mintamazontagger import tagger
 from mintamazontagger import VERSION
 from mintamazontagger.args import (
-    define_gui_args, get_name_to_help_dict, TAGGER_BASE_PATH)
-from mintamazontagger.qt import (
-    MintUpdatesTableModel, AmazonUnmatchedTableDialog, AmazonStatsDialog,
-    TaggerStatsDialog)
-from mintamazontagger.mintclient import MintClient
-from mintamazontagger.my_progress import QtProgress
-from mintamazontagger.webdriver import get_webdriver
+    comma_separated_filter, define_gui_args, get_name_to_help_dict)
+from mintamazontagger.logs import add_file_log_handler
+
+# The tagger, Mint client (selenium), progress and PyPI check modules are
+# imported where used so that the main window can be shown sooner.
 
 logger = logging.getLogger(__name__)
 
@@ -72,21 +68,16 @@ class TaggerGui:
             self.quit_shortcuts.append(s)
 
         logger.info(f'Running version {VERSION}')
-        try:
-            is_outdated, latest_version = check_outdated(
-                'mint-amazon-tagger', VERSION)
-            if is_outdated:
-                outdate_msg = QErrorMessage(self.window)
-                outdate_msg.showMessage(
-                    'A new version is available. Please update for the best '
-                    'experience. '
-                    'https://github.com/jprouty/mint-amazon-tagger')
-                logger.warning(
-                    'Running out of date software is bad. Latest is '
-                    f'{latest_version}')
-        except ValueError:
-            logger.error(
-                f'Version {VERSION} is newer than PyPY version')
+        # Check PyPI off the main thread so the window paints immediately.
+        self.version_check_worker = VersionCheckWorker()
+        self.version_check_thread = QThread(self.window)
+        self.version_check_worker.moveToThread(self.version_check_thread)
+        self.version_check_worker.on_outdated.connect(self.on_outdated)
+        self.version_check_worker.on_done.connect(
+            self.version_check_thread.quit)
+        self.version_check_thread.started.connect(
+            self.version_check_worker.check)
+        self.version_check_thread.start()
 
         v_layout = QVBoxLayout()
         h_layout = QHBoxLayout()
@@ -130,7 +121,9 @@ class TaggerGui:
         mint_layout.addRow(
             self.create_line_label('Description Filter',
                                    'mint_input_description_filter'),
-            self.create_line_edit('mint_input_description_filter'))
+            self.create_line_edit(
+                'mint_input_description_filter',
+                transform=comma_separated_filter))
         mint_layout.addRow(
             self.create_line_label(
                 'Include user description', 'mint_input_include_user_description'),
@@ -142,7 +135,9 @@ class TaggerGui:
         mint_layout.addRow(
             self.create_line_label(
                 'Input Categories Filter', 'mint_input_categories_filter'),
-            self.create_line_edit('mint_input_categories_filter'))
+            self.create_line_edit(
+                'mint_input_categories_filter',
+                transform=comma_separated_filter))
         mint_group.setLayout(mint_layout)
         h_layout.addWidget(mint_group)
 
@@ -211,20 +206,27 @@ class TaggerGui:
                 'amazon_export',
                 'Select Amazon Data Export'
             ))
+        amazon_import_layout.addRow(
+            self.create_line_label(
+                'Cache parsed export', 'cache_amazon_export'),
+            self.create_checkbox('cache_amazon_export'))
         return amazon_import_layout
 
+    def on_outdated(self, latest_version):
+        outdate_msg = QErrorMessage(self.window)
+        outdate_msg.showMessage(
+            'A new version is available. Please update for the best '
+            'experience. '
+            'https://github.com/jprouty/mint-amazon-tagger')
+        logger.warning(
+            'Running out of date software is bad. Latest is '
+            f'{latest_version}')
+
     def on_quit(self):
         pass
 
     def on_tagger_dialog_closed(self):
         self.start_button.setEnabled(True)
-        # Reset any csv file handles, as there might have been an error and
-        # the user may try again (could already be consumed/closed).
-        attr_name = 'amazon_export'
-        files = getattr(self.args, attr_name)
-        if files:
-            files = [open(file.name, 'r', encoding='utf-8') for file in files]
-            setattr(self.args, attr_name, files)
 
     def on_start_button_clicked(self):
         self.start_button.setEnabled(False)
@@ -254,15 +256,6 @@ class TaggerGui:
         self.tagger.show()
         self.tagger.finished.connect(self.on_tagger_dialog_closed)
 
-    def clear_layout(self, layout):
-        if layout:
-            while layout.count():
-                child = layout.takeAt(0)
-                if child.widget() is not None:
-                    child.widget().deleteLater()
-                elif child.layout() is not None:
-                    self.clear_layout(child.layout())
-
     def create_checkbox(self, name, tool_tip=None, invert=False):
         x_box = QCheckBox()
         x_box.setTristate(False)
@@ -291,8 +284,12 @@ class TaggerGui:
             line_edit.setToolTip(tool_tip)
         return line_edit
 
-    def create_line_edit(self, name, tool_tip=None, password=False):
-        line_edit = QLineEdit(getattr(self.args, name))
+    def create_line_edit(
+            self, name, tool_tip=None, password=False, transform=None):
+        value = getattr(self.args, name)
+        if isinstance(value, tuple):
+            value = ','.join(value)
+        line_edit = QLineEdit(value)
         if not tool_tip:
             tool_tip = self.arg_name_to_help[name]
         if tool_tip:
@@ -301,7 +298,7 @@ class TaggerGui:
             line_edit.setEchoMode(QLineEdit.EchoMode.PasswordEchoOnEdit)
 
         def on_changed(state):
-            setattr(self.args, name, state)
+            setattr(self.args, name, transform(state) if transform else state)
 
         def on_return():
             self.advance_focus()
@@ -349,7 +346,7 @@ class TaggerGui:
             if not isinstance(files, list):
                 files = [files]
             
-            label = ' AND '.join([os.path.split(file.name)[1] for file in files])
+            label = ' AND '.join([os.path.split(file)[1] for file in files])
         file_button = QPushButton(label)
 
         if not tool_tip:
@@ -362,13 +359,9 @@ class TaggerGui:
             selection = dlg.getOpenFileNames(
                 self.window, popup_title, filter=filter)
             if selection[0]:
-                prev_files = getattr(self.args, name)
-                if prev_files:
-                    for file in prev_files:
-                        file.close()
-                new_files = [open(file, 'r', encoding='utf-8') for file in selection[0]]
+                new_files = selection[0]
                 setattr(self.args, name, new_files)
-                label = ' AND '.join([os.path.split(file.name)[1] for file in new_files])
+                label = ' AND '.join([os.path.split(file)[1] for file in new_files])
                 file_button.setText(label)
 
         file_button.clicked.connect(on_button)
@@ -454,6 +447,9 @@ class TaggerDialog(QDialog):
 
     def on_report_issue(self):
         logger.info('Report Issue Clicked')
+        # Make sure the log file is complete before the user attaches it.
+        for handler in logging.getLogger().handlers:
+            handler.flush()
         url_params = {
             'title': f'In-app Report for v{VERSION} on {sys.platform}',
             'body': (
@@ -467,6 +463,8 @@ class TaggerDialog(QDialog):
         self.on_stopped()
 
     def open_amazon_order_id(self, order_id):
+        from mintamazontagger import amazon
+
         if order_id:
             QDesktopServices.openUrl(QUrl(
                 amazon.get_invoice_url(order_id)))
@@ -492,6 +490,9 @@ class TaggerDialog(QDialog):
 
         self.label.setText('Select below which updates to send to Mint.')
 
+        from mintamazontagger.qt import (
+            MintUpdatesTableModel, RESIZE_CONTENTS_PRECISION)
+
         self.updates_table_model = MintUpdatesTableModel(results.updates)
         self.updates_table = QTableView()
         self.updates_table.doubleClicked.connect(self.on_double_click)
@@ -506,10 +507,20 @@ class TaggerDialog(QDialog):
 
         self.updates_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.updates_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.updates_table.horizontalHeader().setResizeContentsPrecision(
+            RESIZE_CONTENTS_PRECISION)
         self.updates_table.setModel(self.updates_table_model)
         self.updates_table.setSortingEnabled(True)
         resize()
-        self.updates_table_model.layoutChanged.connect(resize)
+        # Sorting only reorders rows, so the column widths stay valid. Coalesce
+        # bursts of re-sorts into a single re-measure of the row heights.
+        self.resize_rows_timer = QTimer(self)
+        self.resize_rows_timer.setSingleShot(True)
+        self.resize_rows_timer.setInterval(100)
+        self.resize_rows_timer.timeout.connect(
+            self.updates_table.resizeRowsToContents)
+        self.updates_table_model.layoutChanged.connect(
+            self.resize_rows_timer.start)
 
         self.v_layout.insertWidget(2, self.updates_table)
 
@@ -543,14 +554,20 @@ class TaggerDialog(QDialog):
         self.cancel_button.setText('Close')
 
     def on_open_unmatched(self, unmatched):
+        from mintamazontagger.qt import AmazonUnmatchedTableDialog
+
         self.unmatched_dialog = AmazonUnmatchedTableDialog(unmatched)
         self.unmatched_dialog.show()
 
     def on_open_amazon_stats(self, items, charges, refunds):
+        from mintamazontagger.qt import AmazonStatsDialog
+
         self.amazon_stats_dialog = AmazonStatsDialog(items, charges, refunds)
         self.amazon_stats_dialog.show()
 
     def on_open_tagger_stats(self, stats):
+        from mintamazontagger.qt import TaggerStatsDialog
+
         self.tagger_stats_dialog = TaggerStatsDialog(stats)
         self.tagger_stats_dialog.show()
 
@@ -590,33 +607,67 @@ class TaggerDialog(QDialog):
         mfa_code, ok = QInputDialog().getText(
             self, 'Please enter your MFA/OTP Code.',
             'Code:')
-        self.worker.mfa_code = mfa_code
-        QMetaObject.invokeMethod(
-            self.worker, 'mfa_code', Qt.ConnectionType.QueuedConnection,
-            Q_ARG(str, mfa_code))
-        self.worker.on_mfa_done.emit()
+        # The worker thread is blocked waiting for the code, so it cannot
+        # process a queued slot call; hand the code over directly.
+        self.worker.mfa_code(mfa_code)
+
+
+class VersionCheckWorker(QObject):
+    """Checks PyPI for a newer version off of the main Qt thread."""
+    on_outdated = pyqtSignal(str)
+    on_done = pyqtSignal()
+
+    @ pyqtSlot()
+    def check(self):
+        from mintamazontagger.version_check import check_outdated_cached
+
+        try:
+            is_outdated, latest_version = check_outdated_cached(VERSION)
+            if is_outdated:
+                self.on_outdated.emit(latest_version)
+        except ValueError:
+            logger.error(
+                f'Version {VERSION} is newer than PyPY version')
+        except Exception as e:
+            # Never let a failed version check (e.g. offline) stop the tool.
+            logger.debug(f'Version check failed: {e}')
+        finally:
+            self.on_done.emit()
 
 
 class TaggerWorker(QObject):
     """This class is required to prevent locking up the main Qt thread."""
     on_error = pyqtSignal(str)
-    on_review_ready = pyqtSignal(tagger.UpdatesResult)
+    # A tagger.UpdatesResult.
+    on_review_ready = pyqtSignal(object)
     on_updates_sent = pyqtSignal(int)
     on_stopped = pyqtSignal()
     on_mfa = pyqtSignal()
-    on_mfa_done = pyqtSignal()
     on_progress = pyqtSignal(str, int, int)
     stopping = False
     webdriver = None
 
+    def __init__(self, **kwargs):
+        super(TaggerWorker, self).__init__(**kwargs)
+        self.mfa_queue = queue.Queue(maxsize=1)
+
     @ pyqtSlot()
     def stop(self):
         self.stopping = True
 
     @ pyqtSlot(str)
     def mfa_code(self, code):
-        logger.info(code)
-        self.mfa_code = code
+        # Runs on the GUI thread, so never block on the queue.
+        try:
+            self.mfa_queue.put_nowait(code)
+        except queue.Full:
+            # Replace the code the worker has not picked up yet (unless it
+            # just did). Only this thread puts, so the put cannot fail.
+            try:
+                self.mfa_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.mfa_queue.put_nowait(code)
 
     @ pyqtSlot(object)
     def create_updates(self, args, parent):
@@ -639,26 +690,28 @@ class TaggerWorker(QObject):
     @ pyqtSlot()
     def close_webdriver(self):
         if self.webdriver:
-            self.webdriver.close()
+            self.webdriver.quit()
             self.webdriver = None
 
     def get_webdriver(self, args):
         if self.webdriver:
             logger.info('Using existing webdriver')
             return self.webdriver
+        from mintamazontagger.webdriver import get_webdriver
+
         logger.info('Creating a new webdriver')
         self.webdriver = get_webdriver(args.headless, args.session_path)
         return self.webdriver
 
     def do_create_updates(self, args, parent):
+        from mintamazontagger import tagger
+        from mintamazontagger.mintclient import MintClient
+        from mintamazontagger.my_progress import QtProgress
+
         def on_mfa(prompt):
             logger.info('Asking for MFA/OTP')
             self.on_mfa.emit()
-            loop = QEventLoop()
-            self.on_mfa_done.connect(loop.quit)
-            loop.exec_()
-            logger.info(self.mfa_code)
-            return self.mfa_code
+            return self.mfa_queue.get()
 
         # Factory that handles indeterminite, determinite, and counter style.
         def progress_factory(msg, max=0):
@@ -686,6 +739,8 @@ class TaggerWorker(QObject):
             self.close_webdriver()
 
     def do_send_updates(self, updates, args):
+        from mintamazontagger.my_progress import QtProgress
+
         num_updates = self.mint_client.send_updates(
             updates,
             progress=QtProgress(
@@ -698,6 +753,8 @@ class TaggerWorker(QObject):
 
 
 def main():
+    # The frozen app must handle being re-launched as a parse worker process.
+    multiprocessing.freeze_support()
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
     root_logger.addHandler(logging.StreamHandler())
@@ -706,15 +763,7 @@ def main():
     # For helping remote debugging, also log to file.
     # Developers should be vigilant to NOT log any PII, ever (including being
     # mindful of what exceptions might be thrown).
-    log_directory = os.path.join(TAGGER_BASE_PATH, 'Tagger Logs')
-    os.makedirs(log_directory, exist_ok=True)
-    log_filename = os.path.join(
-        log_directory, f'{time.strftime("%Y-%m-%d_%H-%M-%S")}.log')
-    file_handler = logging.FileHandler(log_filename)
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s %(name)s: %(message)s'))
-    file_handler.setLevel(logging.DEBUG)
-    root_logger.addHandler(file_handler)
+    log_filename = add_file_log_handler(root_logger)
 
     parser = argparse.ArgumentParser(
         description='Tag Mint transactions based on itemized Amazon history.')
@@ -1,10 +1,12 @@
-from collections import defaultdict
-from copy import deepcopy
-from datetime import datetime
+from collections import Counter, defaultdict
+from copy import copy
+from datetime import date
+from functools import lru_cache
 import logging
 import pickle
 import re
 import os
+import sys
 
 from mintamazontagger import category
 from mintamazontagger.currency import (
@@ -27,9 +29,7 @@ def truncate_title(title, target_length, base_str=None):
             break
     truncated = ' '.join(words)
     # Remove any trailing symbol-y crap.
-    while truncated and truncated[-1] in ',.-([]{}\\/|~!@#$%^&*_+=`\'" ':
-        truncated = truncated[:-1]
-    return truncated
+    return truncated.rstrip(',.-([]{}\\/|~!@#$%^&*_+=`\'" ')
 
 
 # Credit: https://stackoverflow.com/questions/1175208
@@ -37,16 +37,18 @@ first_cap_re = re.compile('(.)([A-Z][a-z]+)')
 all_cap_re = re.compile('([a-z0-9])([A-Z])')
 
 
+# The same handful of keys repeat for every transaction; only convert each once.
+@lru_cache(maxsize=None)
 def convertCamel_to_underscores(name):
     s1 = first_cap_re.sub(r'\1_\2', name)
     return all_cap_re.sub(r'\1_\2', s1).lower()
 
 
 def convert_camel_dict(raw_dict):
-    return dict([
-        (convertCamel_to_underscores(k.replace(' ', '_')), v)
+    return {
+        convertCamel_to_underscores(k.replace(' ', '_')): v
         for k, v in raw_dict.items()
-    ])
+    }
 
 
 def pythonify_mint_transaction_dict(raw_dict, is_fi_data=False):
@@ -72,11 +74,20 @@ def pythonify_mint_transaction_dict(raw_dict, is_fi_data=False):
 
 
 def pythonify_mint_category_dict(raw_dict):
-    return convert_camel_dict(raw_dict)
+    result = convert_camel_dict(raw_dict)
+    # Category names are looked up in the Mint categories dict for every
+    # (split) transaction. Intern them so those lookups match by identity.
+    if isinstance(result.get('name'), str):
+        result['name'] = sys.intern(result['name'])
+    return result
 
 
+# Many transactions share a date; parse (and store) each date only once.
+@lru_cache(maxsize=4096)
 def parse_mint_date(date_str):
-    return datetime.strptime(date_str, '%Y-%m-%d').date()
+    # Mint dates are always YYYY-MM-DD; fromisoformat is much faster than
+    # strptime.
+    return date.fromisoformat(date_str)
 
 
 class Category(object):
@@ -107,7 +118,9 @@ class Transaction(object):
 
     def split(self, amount, category_name, description, notes):
         """Returns a new Transaction split from self."""
-        item = deepcopy(self)
+        # A shallow copy suffices: every shared mutable attribute is replaced
+        # below.
+        item = copy(self)
 
         # Itemized should NOT have this info, otherwise there are some lovely
         # cycles.
@@ -166,7 +179,7 @@ class Transaction(object):
 
     @staticmethod
     def sum_amounts(trans):
-        return sum([t.amount for t in trans])
+        return sum(t.amount for t in trans)
 
     @staticmethod
     def unsplit(trans):
@@ -180,7 +193,7 @@ class Transaction(object):
                 result.append(t)
 
         for parent_id, children in parent_id_to_trans.items():
-            parent = deepcopy(children[0])
+            parent = copy(children[0])
 
             parent.id = parent_id
             parent.bastardize()
@@ -195,12 +208,13 @@ class Transaction(object):
     @staticmethod
     def old_and_new_are_identical(old, new, ignore_category=False):
         """Returns True if there is zero difference between old and new."""
-        old_set = set(
-            [c.get_compare_tuple(ignore_category) for c in old.children]
-            if old.children
-            else [old.get_compare_tuple(ignore_category)])
-        new_set = set([t.get_compare_tuple(ignore_category) for t in new])
-        return old_set == new_set
+        old_trans = old.children if old.children else [old]
+        if len(old_trans) != len(new):
+            return False
+        # Compare as multisets: repeated identical items must match in count.
+        return (
+            Counter(t.get_compare_tuple(ignore_category) for t in old_trans)
+            == Counter(t.get_compare_tuple(ignore_category) for t in new))
 
 
 class FinancialInstitutionData(object):
@@ -223,11 +237,13 @@ def itemize_new_trans(new_trans, prefix):
         nt.description = prefix + nt.description
 
     # Turns out the first entry is typically displayed last in the Mint
-    # UI. Reverse everything for ideal readability.
-    return new_trans[::-1]
+    # UI. Reverse everything for ideal readability. Like the descriptions
+    # above, this modifies new_trans in place.
+    new_trans.reverse()
+    return new_trans
 
 
-NON_ITEM_DESCRIPTIONS = set([
+NON_ITEM_DESCRIPTIONS = frozenset([
     'Misc Charge (Gift wrap, etc)',
     'Promotion(s)',
     'Shipping',
@@ -244,23 +260,20 @@ def summarize_new_trans(t, new_trans, prefix):
     # When not itemizing, create a description by concating the items. Store
     # the full information in the transaction notes. Category is untouched when
     # there's more than one item (this is why itemizing is better!).
-    title = summarize_title(
-        [nt.description
-         for nt in new_trans
-         if nt.description not in NON_ITEM_DESCRIPTIONS],
-        prefix)
+    items = [nt for nt in new_trans
+             if nt.description not in NON_ITEM_DESCRIPTIONS]
+    title = summarize_title([nt.description for nt in items], prefix)
     notes = '{}\nItem(s):\n{}'.format(
         new_trans[0].notes,
-        '\n'.join(
-            [' - ' + nt.description
-             for nt in new_trans]))
+        '\n'.join(' - ' + nt.description for nt in new_trans))
 
-    summary_trans = deepcopy(t)
+    summary_trans = copy(t)
     summary_trans.description = title
-    if len([nt for nt in new_trans
-            if nt.description not in NON_ITEM_DESCRIPTIONS]) == 1:
-        summary_trans.category = new_trans[0].category
+    if len(items) == 1:
+        summary_trans.category = items[0].category
     else:
+        # Don't rename the original transaction's category.
+        summary_trans.category = copy(t.category)
         summary_trans.category.name = category.DEFAULT_MINT_CATEGORY
     summary_trans.notes = notes
     return [summary_trans]
@@ -290,6 +303,6 @@ def dump_trans_and_categories(trans, cats, pickle_epoch, pickle_base_path):
     cats_pickle_path = os.path.join(
         pickle_base_path, MINT_CATS_PICKLE_FMT.format(pickle_epoch))
     with open(trans_pickle_path, 'wb') as f:
-        pickle.dump(trans, f)
+        pickle.dump(trans, f, protocol=pickle.HIGHEST_PROTOCOL)
     with open(cats_pickle_path, 'wb') as f:
-        pickle.dump(cats, f)
+        pickle.dump(cats, f, protocol=pickle.HIGHEST_PROTOCOL)
@@ -212,6 +212,10 @@ class TransactionClass(unittest.TestCase):
         trans1.children = new_trans
         self.assertTrue(Transaction.old_and_new_are_identical(
             trans1, new_trans))
+        self.assertFalse(Transaction.old_and_new_are_identical(
+            trans1, new_trans[:1]))
+        self.assertFalse(Transaction.old_and_new_are_identical(
+            trans1, new_trans + new_trans[:1]))
 
     def test_itemize_new_trans(self):
         self.assertEqual(mint.itemize_new_trans([], 'Sweet: '), [])
@@ -253,6 +257,8 @@ class TransactionClass(unittest.TestCase):
         self.assertEqual(actual_summary.amount, original_trans.amount)
         self.assertEqual(
             actual_summary.category.name, category.DEFAULT_MINT_CATEGORY)
+        self.assertNotEqual(
+            original_trans.category.name, category.DEFAULT_MINT_CATEGORY)
         self.assertEqual(actual_summary.description,
                          'Amazon.com: Item 1, Item 2')
         self.assertTrue('Item 1' in actual_summary.notes)
@@ -290,6 +296,28 @@ class TransactionClass(unittest.TestCase):
         self.assertTrue('Shipping' in actual_summary.notes)
         self.assertTrue('Promotion(s)' in actual_summary.notes)
 
+    def test_summarize_new_trans_one_item_after_shipping(self):
+        original_trans = transaction(
+            amount=-40.00,
+            description='Amazon',
+            notes='Test note')
+
+        shipping = transaction(
+            amount=-5.00,
+            description='Shipping',
+            category='Shipping')
+        item1 = transaction(
+            amount=-15.00,
+            description='Giant paper shredder',
+            category='Office Supplies')
+
+        actual_summary = mint.summarize_new_trans(
+            original_trans,
+            [shipping, item1],
+            'Amazon.com: ')[0]
+
+        self.assertEqual(actual_summary.category.name, 'Office Supplies')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,14 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import os
 from pprint import pprint
 import requests
+import sys
+import threading
 import time
 
 from mintamazontagger.currency import micro_usd_to_float_usd
 
-from mintapi.api import Mint
-
-from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.common.exceptions import (
+    StaleElementReferenceException, TimeoutException, WebDriverException)
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -22,6 +24,10 @@ MINT_API_VERSION = 'v1'
 MINT_TRANSACTIONS = f'{MINT_API_ENDPOINT}/{MINT_API_VERSION}/transactions'
 MINT_CATEGORIES = f'{MINT_API_ENDPOINT}/{MINT_API_VERSION}/categories'
 
+# Waiting on a person to log in, or on Mint to sync, takes minutes; poll the
+# browser less often than WebDriverWait's default of every 0.5 seconds.
+LONG_WAIT_POLL_SECONDS = 2
+
 
 class MintClient():
     args = None
@@ -67,6 +73,9 @@ class MintClient():
             self.user_login_success = _await_user_login(
                 self.webdriver, self.args.mint_login_timeout)
         else:
+            # mintapi is only needed (and only imported) for automated login.
+            from mintapi.api import Mint
+
             logger.info('Mint Login Flow: MintAPI to complete login')
             logger.info('You may be asked for an auth code at the command line! '
                         'Be sure to press ENTER after typing the 6 digit code.')
@@ -87,12 +96,16 @@ class MintClient():
         return self.is_logged_in()
 
     def get_transactions(self, from_date=None, to_date=None):
+        return list(self.iter_transactions(from_date, to_date))
+
+    def iter_transactions(self, from_date=None, to_date=None):
+        """Yields Mint transactions (json dicts), fetching a page at a time."""
         if not self.login():
             logger.error('Cannot login')
-            return []
+            return
         logger.info(
             f'Getting all Mint transactions since {from_date} to {to_date}.')
-        
+
         limit = 10000
         params = {
             'limit': limit,
@@ -102,15 +115,14 @@ class MintClient():
         response = self.webdriver.request(
             'GET', MINT_TRANSACTIONS, headers=self.get_api_header(),
             params=params)
-        results = []
 
         while True:
             if not _is_json_response_success('transactions', response):
-                return results
+                return
             response_json = response.json()
             if not response_json['metaData']['totalSize']:
                 logger.warning('No transactions found')
-                return results
+                return
             if self.args.mint_save_json:
                 json_path = os.path.join(
                     self.args.mint_json_location,
@@ -120,21 +132,20 @@ class MintClient():
                     pprint(response_json, json_out)
             # Remove all transactions that do not have a fiData message. These are
             # user entered expenses and do not have a fiData entry.
-            results.extend([trans for trans in response_json['Transaction']
-                            if 'fiData' in trans])
-            
-            page_size = response_json['metaData']['pageSize']
-            total_records = response_json['metaData']['totalSize']
-
             next_page = _get_next_link_href(response_json['metaData']['link'])
+            transactions = response_json.pop('Transaction')
+            # Let this page's json be freed as its transactions are consumed.
+            del response, response_json
+            yield from (trans for trans in transactions if 'fiData' in trans)
+            del transactions
+
             if not next_page:
                 # No more transactions.
-                return results
-            else:
-                next_page_url = f'{MINT_API_ENDPOINT}/{next_page}'
-                response = self.webdriver.request(
-                    'GET', next_page_url, headers=self.get_api_header())
-            
+                return
+            next_page_url = f'{MINT_API_ENDPOINT}/{next_page}'
+            response = self.webdriver.request(
+                'GET', next_page_url, headers=self.get_api_header())
+
     def get_categories(self):
         if not self.login():
             logger.error('Cannot login')
@@ -158,72 +169,202 @@ class MintClient():
                 pprint(response_json, json_out)
         result = {}
         for cat in response_json['Category']:
-            result[cat['name']] = cat
+            result[sys.intern(cat['name'])] = cat
         return result
 
-    def send_updates(self, updates, progress, ignore_category=False):
+    def send_updates(
+            self, updates, progress, ignore_category=False,
+            concurrency=6, rate_per_sec=20):
         if not self.login():
             logger.error('Cannot login')
             return 0
+        # The api header requires a round trip to the browser; fetch it once
+        # rather than once per update.
+        headers = self.get_api_header()
+        # The webdriver is not thread-safe: each sender thread gets its own
+        # requests session instead. The sessions share one cookie jar, seeded
+        # from the browser, so a cookie Mint rotates mid-batch reaches them all.
+        browser_cookies = self.webdriver.get_cookies()
+        cookie_jar = _get_cookie_jar(browser_cookies)
+        user_agent = self.webdriver.execute_script(
+            'return navigator.userAgent;')
+        sessions = threading.local()
+
+        def get_session():
+            if not hasattr(sessions, 'session'):
+                sessions.session = _new_requests_session(
+                    cookie_jar, {**headers, 'User-Agent': user_agent})
+            return sessions.session
+
+        limiter = _AdaptiveRateLimiter(concurrency, rate_per_sec)
         num_requests = 0
-        for (orig_trans, new_trans) in updates:
-            if len(new_trans) == 1:
-                # Update the existing transaction.
-                trans = new_trans[0]
-                modify_trans = {
-                    'type': trans.type,
-                    'description': trans.description,
-                    'notes': trans.notes,
-                }
-                if not ignore_category:
-                    modify_trans = {
-                        **modify_trans,
-                        'category': {'id': trans.category.id},
-                    }
-
-                logger.debug(
-                    f'Sending a "modify" transaction request: {modify_trans}')
-                response = self.webdriver.request(
-                    'PUT',
-                    f'{MINT_TRANSACTIONS}/{trans.id}',
-                    json=modify_trans,
-                    headers=self.get_api_header())
-                logger.debug(f'Received response: {response.__dict__}')
-                progress.next()
-                num_requests += 1
-            else:
-                # Split the existing transaction into many.
-                split_children = []
-                for trans in new_trans:
-                    category = (orig_trans.category if ignore_category
-                                else trans.category)
-                    itemized_split = {
-                        'amount': f'{micro_usd_to_float_usd(trans.amount)}',
-                        'description': trans.description,
-                        'category': {'id': category.id, 'name': category.name},
-                        'notes': trans.notes,
-                    }
-                    split_children.append(itemized_split)
-
-                split_edit = {
-                    'type': orig_trans.type,
-                    'amount': micro_usd_to_float_usd(orig_trans.amount),
-                    'splitData': {'children': split_children},
-                }
-                logger.debug(
-                    f'Sending a "split" transaction request: {split_edit}')
-                response = self.webdriver.request(
-                    'PUT',
-                    f'{MINT_TRANSACTIONS}/{trans.id}',
-                    json=split_edit,
-                    headers=self.get_api_header())
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(
+                    self._send_update, url, payload, get_session, limiter)
+                for url, payload in (
+                    _get_update_request(orig_trans, new_trans, ignore_category)
+                    for orig_trans, new_trans in updates)
+            ]
+            for future in as_completed(futures):
+                response = future.result()
                 logger.debug(f'Received response: {response.__dict__}')
                 progress.next()
+                if response.status_code != requests.codes.ok:
+                    logger.error(
+                        f'Failed to update {response.url}: Mint responded '
+                        f'with {response.status_code}')
+                    continue
                 num_requests += 1
 
+        # Keep the browser's session current for any later requests.
+        _update_browser_cookies(self.webdriver, cookie_jar, browser_cookies)
         progress.finish()
         return num_requests
 
+    def _send_update(self, url, payload, get_session, limiter, max_attempts=5):
+        logger.debug(f'Sending a transaction update request: {payload}')
+        for attempt in range(max_attempts):
+            with limiter:
+                response = get_session().put(url, json=payload)
+            if not _is_throttled(response):
+                limiter.succeeded()
+                break
+            backoff = limiter.throttle(attempt)
+            logger.warning(
+                f'Mint responded with {response.status_code}; retrying in '
+                f'{backoff:.1f} seconds')
+            time.sleep(backoff)
+        return response
+
+
+def _get_cookie_jar(browser_cookies):
+    """Returns a cookie jar holding the given webdriver cookies."""
+    cookie_jar = requests.cookies.RequestsCookieJar()
+    for cookie in browser_cookies:
+        cookie_jar.set(
+            cookie['name'], cookie['value'],
+            domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return cookie_jar
+
+
+def _new_requests_session(cookie_jar, headers):
+    """Returns a requests session with the given cookies and headers."""
+    session = requests.Session()
+    session.headers.update(headers)
+    session.cookies = cookie_jar
+    return session
+
+
+def _update_browser_cookies(webdriver, cookie_jar, browser_cookies):
+    """Copies cookies that Mint set or changed in cookie_jar to the browser."""
+    original_values = {
+        (c['name'], c.get('domain')): c['value'] for c in browser_cookies}
+    for cookie in cookie_jar:
+        if original_values.get((cookie.name, cookie.domain)) == cookie.value:
+            continue
+        try:
+            webdriver.add_cookie({
+                'name': cookie.name,
+                'value': cookie.value,
+                'domain': cookie.domain,
+                'path': cookie.path,
+                'secure': bool(cookie.secure),
+            })
+        except WebDriverException as e:
+            logger.warning(f'Cannot update browser cookie {cookie.name}: {e}')
+
+
+def _get_update_request(orig_trans, new_trans, ignore_category=False):
+    """Returns the url and json payload to update orig_trans to new_trans."""
+    if len(new_trans) == 1:
+        # Update the existing transaction.
+        trans = new_trans[0]
+        modify_trans = {
+            'type': trans.type,
+            'description': trans.description,
+            'notes': trans.notes,
+        }
+        if not ignore_category:
+            modify_trans = {
+                **modify_trans,
+                'category': {'id': trans.category.id},
+            }
+        return f'{MINT_TRANSACTIONS}/{trans.id}', modify_trans
+
+    # Split the existing transaction into many.
+    split_children = []
+    for trans in new_trans:
+        category = (orig_trans.category if ignore_category
+                    else trans.category)
+        itemized_split = {
+            'amount': f'{micro_usd_to_float_usd(trans.amount)}',
+            'description': trans.description,
+            'category': {'id': category.id, 'name': category.name},
+            'notes': trans.notes,
+        }
+        split_children.append(itemized_split)
+
+    split_edit = {
+        'type': orig_trans.type,
+        'amount': micro_usd_to_float_usd(orig_trans.amount),
+        'splitData': {'children': split_children},
+    }
+    return f'{MINT_TRANSACTIONS}/{trans.id}', split_edit
+
+
+def _is_throttled(response):
+    return (response.status_code == requests.codes.too_many_requests
+            or response.status_code >= 500)
+
+
+class _AdaptiveRateLimiter():
+    """Bounds in-flight requests and their rate; backs off when throttled.
+
+    Used as a context manager around each request. Every throttled response
+    halves the number of allowed in-flight requests (down to one); every
+    successful one allows one more, back up to the original concurrency.
+    """
+
+    def __init__(self, concurrency, rate_per_sec, base_backoff=0.5):
+        self.max_limit = concurrency
+        self.limit = concurrency
+        self.in_flight = 0
+        self.interval = 1.0 / rate_per_sec
+        self.next_start = time.monotonic()
+        self.base_backoff = base_backoff
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            # Token bucket with a single token: space out request starts.
+            now = time.monotonic()
+            delay = self.next_start - now
+            self.next_start = max(now, self.next_start) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+        return self
+
+    def __exit__(self, *exc_info):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+    def throttle(self, attempt):
+        """Reduces concurrency and returns how long to back off for."""
+        with self.condition:
+            self.limit = max(1, self.limit // 2)
+        return self.base_backoff * 2 ** attempt
+
+    def succeeded(self):
+        """Allows one more in-flight request, up to the original concurrency."""
+        with self.condition:
+            if self.limit < self.max_limit:
+                self.limit += 1
+                self.condition.notify()
+
 
 def _get_next_link_href(links):
     for l in links:
@@ -258,7 +399,9 @@ def _get_api_header(webdriver):
 
 def _await_user_login(webdriver, timeout):
     try:
-        WebDriverWait(webdriver, timeout).until(EC.url_contains(MINT_OVERVIEW))
+        WebDriverWait(
+            webdriver, timeout, poll_frequency=LONG_WAIT_POLL_SECONDS).until(
+                EC.url_contains(MINT_OVERVIEW))
         return True
     except TimeoutException:
         logger.info(
@@ -279,7 +422,9 @@ def _wait_for_overview_loaded(
         logger.info('Mint overview loaded')
         if (wait_for_sync):
             logger.info('Waiting for Mint to sync accounts')
-            WebDriverWait(webdriver, wait_for_sync_timeout).until(
+            WebDriverWait(
+                webdriver, wait_for_sync_timeout,
+                poll_frequency=LONG_WAIT_POLL_SECONDS).until(
                 EC.visibility_of_element_located(
                     (By.XPATH,
                      '//strong[text()="Account refresh complete."]')))
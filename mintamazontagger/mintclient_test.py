@@ -0,0 +1,193 @@
+from types import SimpleNamespace
+import unittest
+from unittest import mock
+
+from mintamazontagger import mintclient
+from mintamazontagger.mockdata import transaction
+
+MINT_TRANSACTION_URL = 'https://mint.intuit.com/pfm/v1/transactions/975256256'
+
+
+class FakeWebdriver():
+    def __init__(self):
+        self.added_cookies = []
+
+    def get_cookies(self):
+        return [{'name': 'session', 'value': 'old', 'domain': '.intuit.com',
+                 'path': '/'}]
+
+    def execute_script(self, script):
+        return 'abc'
+
+    def add_cookie(self, cookie):
+        self.added_cookies.append(cookie)
+
+
+class FakeSession():
+    """Responds to each put with the next of status_codes."""
+
+    def __init__(self, cookie_jar, status_codes, new_cookie_value=None):
+        self.cookies = cookie_jar
+        self.status_codes = list(status_codes)
+        self.new_cookie_value = new_cookie_value
+        self.num_puts = 0
+
+    def put(self, url, json=None):
+        self.num_puts += 1
+        if self.new_cookie_value:
+            self.cookies.set(
+                'session', self.new_cookie_value, domain='.intuit.com',
+                path='/')
+        return SimpleNamespace(status_code=self.status_codes.pop(0), url=url)
+
+
+class AdaptiveRateLimiter(unittest.TestCase):
+    def test_throttle_halves_limit(self):
+        limiter = mintclient._AdaptiveRateLimiter(6, 100)
+        limiter.throttle(0)
+        self.assertEqual(limiter.limit, 3)
+        limiter.throttle(1)
+        self.assertEqual(limiter.limit, 1)
+        limiter.throttle(2)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_throttle_backs_off_exponentially(self):
+        limiter = mintclient._AdaptiveRateLimiter(6, 100, base_backoff=0.5)
+        self.assertEqual(limiter.throttle(0), 0.5)
+        self.assertEqual(limiter.throttle(3), 4.0)
+
+    def test_succeeded_restores_limit(self):
+        limiter = mintclient._AdaptiveRateLimiter(6, 100)
+        limiter.throttle(0)
+        limiter.throttle(0)
+        limiter.succeeded()
+        self.assertEqual(limiter.limit, 2)
+        for _ in range(10):
+            limiter.succeeded()
+        self.assertEqual(limiter.limit, 6)
+
+
+class GetUpdateRequest(unittest.TestCase):
+    def test_modify(self):
+        orig_trans = transaction()
+        new_trans = orig_trans.split(
+            orig_trans.amount, 'Shopping', 'Some item', 'Some note')
+        new_trans.category.id = '8_2'
+
+        self.assertEqual(
+            mintclient._get_update_request(orig_trans, [new_trans]),
+            (MINT_TRANSACTION_URL, {
+                'type': 'CashAndCreditTransaction',
+                'description': 'Some item',
+                'notes': 'Some note',
+                'category': {'id': '8_2'},
+            }))
+
+    def test_modify_ignore_category(self):
+        orig_trans = transaction()
+        new_trans = orig_trans.split(
+            orig_trans.amount, 'Shopping', 'Some item', 'Some note')
+
+        self.assertEqual(
+            mintclient._get_update_request(
+                orig_trans, [new_trans], ignore_category=True),
+            (MINT_TRANSACTION_URL, {
+                'type': 'CashAndCreditTransaction',
+                'description': 'Some item',
+                'notes': 'Some note',
+            }))
+
+    def test_split(self):
+        orig_trans = transaction(amount=-40.00)
+        new_trans = [
+            orig_trans.split(-15000000, 'Shopping', 'Item 1', 'Note 1'),
+            orig_trans.split(-25000000, 'Books', 'Item 2', 'Note 2'),
+        ]
+
+        self.assertEqual(
+            mintclient._get_update_request(orig_trans, new_trans),
+            (MINT_TRANSACTION_URL, {
+                'type': 'CashAndCreditTransaction',
+                'amount': -40.0,
+                'splitData': {'children': [
+                    {'amount': '-15.0', 'description': 'Item 1',
+                     'category': {'id': None, 'name': 'Shopping'},
+                     'notes': 'Note 1'},
+                    {'amount': '-25.0', 'description': 'Item 2',
+                     'category': {'id': None, 'name': 'Books'},
+                     'notes': 'Note 2'},
+                ]},
+            }))
+
+    def test_split_ignore_category(self):
+        orig_trans = transaction(amount=-40.00)
+        new_trans = [
+            orig_trans.split(-15000000, 'Shopping', 'Item 1', 'Note 1'),
+            orig_trans.split(-25000000, 'Books', 'Item 2', 'Note 2'),
+        ]
+
+        _, split_edit = mintclient._get_update_request(
+            orig_trans, new_trans, ignore_category=True)
+        self.assertEqual(
+            [c['category'] for c in split_edit['splitData']['children']],
+            [{'id': '8_4', 'name': 'Personal Care'}] * 2)
+
+
+@mock.patch.object(mintclient.time, 'sleep')
+class SendUpdates(unittest.TestCase):
+    def send_updates(self, status_codes, num_updates=1, **kwargs):
+        client = mintclient.MintClient(SimpleNamespace(), None)
+        client.user_login_success = True
+        client.webdriver = FakeWebdriver()
+        sessions = []
+
+        def new_session(cookie_jar, headers):
+            sessions.append(FakeSession(cookie_jar, status_codes, **kwargs))
+            return sessions[-1]
+
+        orig_trans = transaction()
+        updates = [
+            (orig_trans, [orig_trans.split(
+                orig_trans.amount, 'Shopping', f'Item {i}', '')])
+            for i in range(num_updates)]
+        progress = mock.Mock()
+        with mock.patch.object(
+                mintclient, '_new_requests_session', new_session):
+            num_sent = client.send_updates(
+                updates, progress, concurrency=1, rate_per_sec=1000)
+        self.assertEqual(progress.next.call_count, num_updates)
+        return num_sent, sessions[0], client.webdriver
+
+    def test_sends_updates(self, sleep):
+        num_sent, session, _ = self.send_updates([200, 200], num_updates=2)
+        self.assertEqual(num_sent, 2)
+        self.assertEqual(session.num_puts, 2)
+
+    def test_retries_throttled_update(self, sleep):
+        num_sent, session, _ = self.send_updates([429, 503, 200])
+        self.assertEqual(num_sent, 1)
+        self.assertEqual(session.num_puts, 3)
+
+    def test_gives_up_after_max_attempts(self, sleep):
+        num_sent, session, _ = self.send_updates([503] * 5)
+        self.assertEqual(num_sent, 0)
+        self.assertEqual(session.num_puts, 5)
+
+    def test_does_not_count_or_retry_rejected_update(self, sleep):
+        num_sent, session, _ = self.send_updates([401, 200], num_updates=2)
+        self.assertEqual(num_sent, 1)
+        self.assertEqual(session.num_puts, 2)
+
+    def test_copies_changed_cookies_to_browser(self, sleep):
+        _, _, webdriver = self.send_updates([200], new_cookie_value='new')
+        self.assertEqual(
+            [(c['name'], c['value']) for c in webdriver.added_cookies],
+            [('session', 'new')])
+
+    def test_keeps_unchanged_cookies(self, sleep):
+        _, _, webdriver = self.send_updates([200])
+        self.assertEqual(webdriver.added_cookies, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
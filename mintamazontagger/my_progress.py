@@ -1,5 +1,5 @@
-from threading import Thread
-import time
+import sys
+from threading import Event, Thread
 
 from progress.bar import IncrementalBar
 from progress.counter import Counter
@@ -10,20 +10,23 @@ class AsyncProgress:
     def __init__(self, progress):
         super()
         self.progress = progress
-        self.spinning = True
-        self.timer = Thread(target=self.runnable)
+        self.finished = Event()
+        # Daemon, so an exception before finish() cannot hang the exit.
+        self.timer = Thread(target=self.runnable, daemon=True)
         self.timer.start()
 
     def next(self, i=1):
         pass
 
     def runnable(self):
-        while self.spinning:
+        # Wakes immediately on finish(), rather than up to 100ms later.
+        while not self.finished.wait(0.1):
             self.progress.next()
-            time.sleep(0.1)
 
     def finish(self):
-        self.spinning = False
+        self.finished.set()
+        # Don't let a last tick draw after the progress is finished.
+        self.timer.join()
         self.progress.finish()
         print()
 
@@ -42,6 +45,9 @@ class QtProgress:
         self.curr = 0
         self.max = max
         self.emitter = emitter
+        # Each emit crosses threads & redraws; only emit in ~1% steps.
+        self.emit_every = max // 100 or 1
+        self.last_emit = 0
 
         self.emitter(self.msg, self.max, self.curr)
 
@@ -49,23 +55,42 @@ class QtProgress:
         self.curr += incr
         if self.curr > self.max:
             self.max += self.max if self.max else 32
+            self.emit_every = self.max // 100 or 1
+        if (self.curr - self.last_emit >= self.emit_every
+                or self.curr == self.max):
+            self.emit()
+
+    def emit(self):
         self.emitter(self.msg, self.max, self.curr)
+        self.last_emit = self.curr
 
     def finish(self):
-        pass
+        if self.curr != self.last_emit:
+            self.emit()
 
 
-def no_progress_factory(msg, max):
+def no_progress_factory(msg, max=0):
     return NoProgress()
 
 
+def is_tty():
+    """Progress is drawn on stderr; skip it entirely when that is not a TTY."""
+    return sys.stderr.isatty()
+
+
 def indeterminate_progress_cli(msg, max=0):
+    if not is_tty():
+        return NoProgress()
     return AsyncProgress(Spinner(msg))
 
 
 def determinate_progress_cli(msg, max):
+    if not is_tty():
+        return NoProgress()
     return IncrementalBar(msg, max=max)
 
 
 def counter_progress_cli(msg, max=0):
+    if not is_tty():
+        return NoProgress()
     return Counter(msg + ' - ')
@@ -1,7 +1,6 @@
-from collections import defaultdict
 import operator
 
-from PyQt6.QtCore import Qt, QAbstractTableModel, QUrl
+from PyQt6.QtCore import Qt, QAbstractTableModel, QTimer, QUrl
 from PyQt6.QtGui import QDesktopServices
 from PyQt6.QtWidgets import (
     QAbstractItemView, QDialog, QLabel, QPushButton, QTableView, QVBoxLayout)
@@ -10,6 +9,10 @@ from mintamazontagger import amazon
 from mintamazontagger import mint
 from mintamazontagger.currency import micro_usd_to_usd_string
 
+# Size table columns from the visible rows plus at most this many others,
+# rather than measuring every cell.
+RESIZE_CONTENTS_PRECISION = 50
+
 
 class MintUpdatesTableModel(QAbstractTableModel):
     def __init__(self, updates, **kwargs):
@@ -151,10 +154,18 @@ class AmazonUnmatchedTableDialog(QDialog):
 
         table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.horizontalHeader().setResizeContentsPrecision(
+            RESIZE_CONTENTS_PRECISION)
         table.setModel(self.model)
         table.setSortingEnabled(True)
         resize()
-        self.model.layoutChanged.connect(resize)
+        # Sorting only reorders rows, so the column widths stay valid. Coalesce
+        # bursts of re-sorts into a single re-measure of the row heights.
+        self.resize_rows_timer = QTimer(self)
+        self.resize_rows_timer.setSingleShot(True)
+        self.resize_rows_timer.setInterval(100)
+        self.resize_rows_timer.timeout.connect(table.resizeRowsToContents)
+        self.model.layoutChanged.connect(self.resize_rows_timer.start)
 
         v_layout.addWidget(table)
 
@@ -194,11 +205,7 @@ class AmazonUnmatchedTableModel(QAbstractTableModel):
             'Order ID',
         ]
         self.my_data = []
-        by_oid = defaultdict(list)
-        for uo in unmatched_charges:
-            by_oid[uo.order_id()].append(uo)
-        for unmatched_by_oid in by_oid.values():
-            merged = amazon.Charge.merge(unmatched_by_oid)
+        for merged in amazon.Charge.merge_by_order_id(unmatched_charges):
             self.my_data.append(self._create_row(merged))
 
     def _create_row(self, amzn_obj):
@@ -266,27 +273,48 @@ class AmazonStatsDialog(QDialog):
             close_button.clicked.connect(self.close)
             return
 
-        first_order_date = min([d for c in charges for d in c.order_dates()])
-        last_order_date = max([d for c in charges for d in c.order_dates()])
+        # Accumulate everything in a single pass over charges and over items.
+        first_order_date = last_order_date = None
+        order_total_sum = 0
+        min_order_total = max_order_total = None
+        for c in charges:
+            for d in c.order_dates():
+                if first_order_date is None or d < first_order_date:
+                    first_order_date = d
+                if last_order_date is None or d > last_order_date:
+                    last_order_date = d
+            order_total = c.total_owed()
+            order_total_sum += order_total
+            if min_order_total is None or order_total < min_order_total:
+                min_order_total = order_total
+            if max_order_total is None or order_total > max_order_total:
+                max_order_total = order_total
+
+        item_total_sum = 0
+        min_item_total = max_item_total = None
+        for i in items:
+            item_total = i.total()
+            item_total_sum += item_total
+            if min_item_total is None or item_total < min_item_total:
+                min_item_total = item_total
+            if max_item_total is None or item_total > max_item_total:
+                max_item_total = item_total
 
         v_layout.addWidget(QLabel(
             f'charges ranging from {first_order_date} to {last_order_date}'))
 
-        per_item_totals = [i.total() for i in items]
-        per_order_totals = [c.total_owed() for c in charges]
-
         v_layout.addWidget(QLabel(
-            f'{micro_usd_to_usd_string(sum(per_order_totals))} total spend'))
+            f'{micro_usd_to_usd_string(order_total_sum)} total spend'))
         v_layout.addWidget(QLabel(
-            f'{micro_usd_to_usd_string(sum(per_order_totals) / len(charges))} '
+            f'{micro_usd_to_usd_string(order_total_sum / len(charges))} '
             'avg order total (range: '
-            f'{micro_usd_to_usd_string(min(per_order_totals))} - '
-            f'{micro_usd_to_usd_string(max(per_order_totals))})'))
+            f'{micro_usd_to_usd_string(min_order_total)} - '
+            f'{micro_usd_to_usd_string(max_order_total)})'))
         v_layout.addWidget(QLabel(
-            f'{micro_usd_to_usd_string(sum(per_item_totals) / len(items))} '
+            f'{micro_usd_to_usd_string(item_total_sum / len(items))} '
             'avg item price (range: '
-            f'{micro_usd_to_usd_string(min(per_item_totals))} - '
-            f'{micro_usd_to_usd_string(max(per_item_totals))})'))
+            f'{micro_usd_to_usd_string(min_item_total)} - '
+            f'{micro_usd_to_usd_string(max_item_total)})'))
 
         if refunds:
             first_refund_date = min(
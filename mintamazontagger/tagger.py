@@ -7,9 +7,13 @@
 # https://www.amazon.com/gp/b2b/reports
 
 from collections import defaultdict, namedtuple, Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import datetime
+from functools import partial
 import itertools
 import logging
+import os
 import readchar
 import time
 import zipfile
@@ -40,6 +44,56 @@ UpdatesResult = namedtuple(
     defaults=(False, None, None, None, None, None),
 )
 
+# Below this many (uncompressed) bytes of order history, starting worker
+# processes costs more than parsing the CSVs in threads.
+MIN_PROCESS_PARSE_BYTES = 1024 * 1024
+
+
+def parse_order_history_csv(
+    export_zip, csv, cache_location=None, progress_factory=no_progress_factory
+):
+    """Parses one order history CSV from an export; must remain picklable."""
+    if cache_location:
+        cache_path = amazon.get_items_cache_path(export_zip, csv, cache_location)
+        items = amazon.get_items_from_cache(cache_path)
+        if items is not None:
+            return items
+    with zipfile.ZipFile(export_zip) as zip_file:
+        items = amazon.Item.parse_from_csv(
+            zip_file.open(csv),
+            progress_factory=progress_factory,
+            num_bytes=zip_file.getinfo(csv).file_size,
+        )
+    if cache_location:
+        amazon.dump_items_to_cache(items, cache_path)
+    return items
+
+
+def parse_order_history_csvs(order_history_csvs, parse, max_processes=0):
+    """Returns the items of every (export_zip, csv), parsed concurrently.
+
+    With max_processes, parses in that many worker processes, falling back to
+    threads if the pool breaks (e.g. a worker is killed when out of memory).
+    """
+    if max_processes:
+        try:
+            return _map_order_history_csvs(
+                ProcessPoolExecutor(max_workers=max_processes),
+                parse,
+                order_history_csvs,
+            )
+        except BrokenProcessPool as e:
+            logger.warning(f"Parsing in worker processes failed ({e}); using threads")
+    return _map_order_history_csvs(ThreadPoolExecutor(), parse, order_history_csvs)
+
+
+def _map_order_history_csvs(executor, parse, order_history_csvs):
+    items = []
+    with executor:
+        for csv_items in executor.map(parse, *zip(*order_history_csvs)):
+            items.extend(csv_items)
+    return items
+
 
 def create_updates(
     args,
@@ -49,38 +103,59 @@ def create_updates(
     determinate_progress_factory=no_progress_factory,
     counter_progress_factory=no_progress_factory,
 ):
-    items = []
+    order_history_csvs = []
+    order_history_bytes = 0
     for export_zip in args.amazon_export:
-        with zipfile.ZipFile(export_zip.name) as zip_file:
-            order_history_csvs = [
+        with zipfile.ZipFile(export_zip) as zip_file:
+            export_csvs = [
                 f for f in zip_file.namelist() if amazon.is_order_history_csv(f)
             ]
-            if not order_history_csvs:
-                on_critical(
-                    "Cannot find any order history data in the given Amazon Export."
-                )
-                return UpdatesResult()
-
-            try:
-                for csv in order_history_csvs:
-                    items.extend(
-                        amazon.Item.parse_from_csv(
-                            zip_file.open(csv),
-                            progress_factory=determinate_progress_factory,
-                        )
-                    )
-            except AttributeError as e:
-                msg = (
-                    "Error while parsing Amazon Order history report CSV files: " f"{e}"
-                )
-                logger.exception(msg)
-                on_critical(msg)
-                return UpdatesResult()
+            order_history_bytes += sum(
+                zip_file.getinfo(f).file_size for f in export_csvs
+            )
+        if not export_csvs:
+            on_critical(
+                "Cannot find any order history data in the given Amazon Export."
+            )
+            return UpdatesResult()
+        order_history_csvs.extend((export_zip, csv) for csv in export_csvs)
+
+    # Each order history CSV is independent, so parse them concurrently. A
+    # lone CSV keeps its determinate progress bar; multiple CSVs share one
+    # indeterminate progress to avoid garbled output. Large multi-CSV exports
+    # are parsed in separate processes, as parsing is CPU bound.
+    single_csv = len(order_history_csvs) == 1
+    cache_location = args.amazon_cache_location if args.cache_amazon_export else None
+    max_processes = 0
+    if single_csv:
+        parse_progress = no_progress_factory(None)
+        parse = partial(
+            parse_order_history_csv,
+            cache_location=cache_location,
+            progress_factory=determinate_progress_factory,
+        )
+    else:
+        parse_progress = indeterminate_progress_factory(
+            f"Parsing {len(order_history_csvs)} Amazon order history CSVs"
+        )
+        if order_history_bytes >= MIN_PROCESS_PARSE_BYTES:
+            max_processes = min(len(order_history_csvs), os.cpu_count() or 1)
+        parse = partial(parse_order_history_csv, cache_location=cache_location)
+    try:
+        items = parse_order_history_csvs(order_history_csvs, parse, max_processes)
+    except AttributeError as e:
+        msg = "Error while parsing Amazon Order history report CSV files: " f"{e}"
+        logger.exception(msg)
+        on_critical(msg)
+        return UpdatesResult()
+    finally:
+        parse_progress.finish()
 
     if not len(items):
         on_critical(
             "The Items report contains no data. Try "
-            f"downloading again. Reports used: {order_history_csvs}"
+            "downloading again. Reports used: "
+            f"{[csv for _, csv in order_history_csvs]}"
         )
         return UpdatesResult()
 
@@ -94,8 +169,9 @@ def create_updates(
     )
 
     # Initialize the stats. Explicitly initialize stats that might not be
-    # accumulated (conditionals).
-    stats = Counter(
+    # accumulated (conditionals). A plain dict keeps the increments in the
+    # get_mint_updates loop cheap.
+    stats = dict(
         adjust_itemized_tax=0,
         already_up_to_date=0,
         rm_shipping_error=0,
@@ -107,12 +183,26 @@ def create_updates(
         personal_cat=0,
     )
 
-    # Remove items from canceled charges or pending charges (only accept "Closed" orders).
-    items = [i for i in items if i.order_status == "Closed"]
-    # Remove items that haven't shipped yet / aren't charged / or cancelled items out of an otherwise valid order.
-    items = [i for i in items if i.shipment_status != "Not Available"]
-    # Remove items with zero quantity.
-    items = [i for i in items if i.quantity > 0]
+    # Filter items in a single pass, tracking the date of the oldest remaining
+    # order along the way (used to bound the Mint transaction fetch).
+    valid_items = []
+    oldest_order_date = None
+    for i in items:
+        # Remove items from canceled charges or pending charges (only accept "Closed" orders).
+        if i.order_status != "Closed":
+            continue
+        # Remove items that haven't shipped yet / aren't charged / or cancelled items out of an otherwise valid order.
+        if i.shipment_status == "Not Available":
+            continue
+        # Remove items with zero quantity.
+        if i.quantity <= 0:
+            continue
+        valid_items.append(i)
+        for order_date in i.order_date:
+            order_date = order_date.date()
+            if oldest_order_date is None or order_date < oldest_order_date:
+                oldest_order_date = order_date
+    items = valid_items
 
     charges = [amazon.Charge([i]) for i in items]
     # THIS IS NOT ALWAYS THE CASE: I HAVE FOUND A CASE WERE THE SHIPMENT ITEM AMOUNTS WERE ACTUALLY SPLIT INTO TWO CC CHARGES FOR THE SAME CARD FOR AN ORDER THAT SHIPPED IN ONE BOX.
@@ -156,7 +246,7 @@ def create_updates(
         pickle_progress.finish()
     else:
         # Get the date of the oldest Amazon order.
-        start_date = min([date.date() for i in items for date in i.order_date])
+        start_date = oldest_order_date
 
         login_progress = indeterminate_progress_factory("Logging in to mint.com")
         if not mint_client.login():
@@ -165,21 +255,23 @@ def create_updates(
             return UpdatesResult()
         login_progress.finish()
 
+        # Both requests go through the one webdriver, which is not
+        # thread-safe, so they are made one after the other.
         cat_progress = indeterminate_progress_factory("Getting Mint Categories")
         mint_categories = mint_client.get_categories()
         cat_progress.finish()
 
-        trans_progress = indeterminate_progress_factory("Getting Mint Transactions")
-        mint_transactions_json = mint_client.get_transactions(start_date)
-        trans_progress.finish()
-
-        parse_progress = determinate_progress_factory(
-            "Parsing Mint Transactions", len(mint_transactions_json)
-        )
-        mint_trans = mint.Transaction.parse_from_json(
-            mint_transactions_json, parse_progress
+        # Transactions are streamed and parsed a page at a time (never holding
+        # all the raw json at once).
+        fetch_progress = counter_progress_factory(
+            "Getting and parsing Mint Transactions"
         )
-        parse_progress.finish()
+        try:
+            mint_trans = mint.Transaction.parse_from_json(
+                mint_client.iter_transactions(start_date), fetch_progress
+            )
+        finally:
+            fetch_progress.finish()
 
         if args.save_pickle_backup:
             pickle_epoch = int(time.time())
@@ -266,8 +358,9 @@ def get_mint_updates(
     stats["trans"] = len(trans)
     trans = sorted(trans, key=lambda t: t.date)
 
-    # Skip t if the original description doesn't contain 'amazon'
-    merch_whitelist = args.mint_input_description_filter.lower().split(",")
+    # Skip t if the original description doesn't contain 'amazon'. The filter
+    # is already split and lowercased at arg parsing time.
+    merch_whitelist = args.mint_input_description_filter
 
     def get_original_names(t):
         """Returns a tuple of description strings to consider"""
@@ -286,23 +379,35 @@ def get_mint_updates(
             result = result + (t.fi_data.inferred_description.lower(),)
         return result
 
-    trans = [
-        t
-        for t in trans
-        if any(
-            any(merch_str in n for n in get_original_names(t))
-            for merch_str in merch_whitelist
-        )
-    ]
+    cat_whitelist = (
+        set(args.mint_input_categories_filter)
+        if args.mint_input_categories_filter
+        else None
+    )
 
-    stats["amazon_in_desc"] = len(trans)
-    # Skip t if it's pending.
-    trans = [t for t in trans if not t.is_pending]
-    stats["pending"] = stats["amazon_in_desc"] - len(trans)
-    # Skip t if a category filter is given and t does not match.
-    if args.mint_input_categories_filter:
-        cat_whitelist = set(args.mint_input_categories_filter.lower().split(","))
-        trans = [t for t in trans if t.category.name.lower() in cat_whitelist]
+    # Apply all of the transaction filters in a single pass.
+    num_amazon_in_desc = 0
+    num_pending = 0
+    filtered_trans = []
+    for t in trans:
+        if merch_whitelist and not any(
+            merch_str in n
+            for n in get_original_names(t)
+            for merch_str in merch_whitelist
+        ):
+            continue
+        num_amazon_in_desc += 1
+        # Skip t if it's pending.
+        if t.is_pending:
+            num_pending += 1
+            continue
+        # Skip t if a category filter is given and t does not match.
+        if cat_whitelist and t.category.name.lower() not in cat_whitelist:
+            continue
+        filtered_trans.append(t)
+    trans = filtered_trans
+    stats["amazon_in_desc"] = num_amazon_in_desc
+    stats["pending"] = num_pending
 
     # Match charges.
     orderMatchProgress = progress_factory(
@@ -313,31 +418,32 @@ def get_mint_updates(
     )
     orderMatchProgress.finish()
 
-    unmatched_trans = [t for t in trans if not t.charges]
+    matched_charges = []
+    unmatched_charges = []
+    for c in charges:
+        (matched_charges if c.matched else unmatched_charges).append(c)
 
-    unmatched_charges = [c for c in charges if not c.matched]
-    matched_charges = [c for c in charges if c.matched]
-
-    unmatched_trans = [t for t in trans if not t.charges]
-    matched_trans = [t for t in trans if t.charges]
+    matched_trans = []
+    unmatched_trans = []
+    for t in trans:
+        (matched_trans if t.charges else unmatched_trans).append(t)
 
-    num_gift_card = 0
-    num_gift_card = len(
-        [
-            c
-            for c in unmatched_charges
-            if "Gift Certificate/Card" in c.payment_instrument_types()
-        ]
+    num_gift_card = sum(
+        1
+        for c in unmatched_charges
+        if "Gift Certificate/Card" in c.payment_instrument_types()
     )
-    num_unshipped = len([c for c in unmatched_charges if not c.transact_date()])
+    num_unshipped = sum(1 for c in unmatched_charges if not c.transact_date())
 
     # matched_refunds = [r for r in refunds if r.matched]
 
+    # trans is sorted by date (and filtering keeps that order), so the range is
+    # simply the first and last unmatched transaction.
     stats["earliest_transaction_date"] = (
-        min([t.date for t in unmatched_trans]) if unmatched_trans else None
+        unmatched_trans[0].date if unmatched_trans else None
     )
     stats["latest_transaction_date"] = (
-        max([t.date for t in unmatched_trans]) if unmatched_trans else None
+        unmatched_trans[-1].date if unmatched_trans else None
     )
 
     stats["trans_unmatch"] = len(unmatched_trans)
@@ -457,18 +563,19 @@ def mark_best_as_matched(t, list_of_charges_or_refunds, args, progress=None):
     closest_match = None
 
     for charges in list_of_charges_or_refunds:
-        last_shipment = max([c.transact_date() for c in charges if c.transact_date()])
-        if not last_shipment:
-            continue
-        num_days = (t.date - last_shipment).days
         # TODO: consider charges even if it has a matched_transaction if this
         # transaction is closer.
-        already_matched = any([c.matched for c in charges])
+        # Check this first as it is much cheaper than computing ship dates.
+        if any(c.matched for c in charges):
+            continue
+        ship_dates = [d for d in (c.transact_date() for c in charges) if d]
+        if not ship_dates:
+            continue
+        num_days = (t.date - max(ship_dates)).days
         if (
             num_days <= max_days
             and num_days >= 0
             and num_days < closest_match_num_days
-            and not already_matched
         ):
             closest_match = charges
             closest_match_num_days = num_days
@@ -502,6 +609,9 @@ def match_transactions_orig(unmatched_trans, unmatched_charges, args, progress=N
     for c in unmatched_charges:
         oid_to_charges[c.order_id()].append(c)
 
+    # Only combinations summing to an unmatched transaction's amount can ever
+    # match; keep just those rather than every combination.
+    trans_amounts = {t.amount for t in unmatched_trans}
     amount_to_charges = defaultdict(list)
     for charges_same_id in oid_to_charges.values():
         if len(charges_same_id) == 1:
@@ -511,12 +621,17 @@ def match_transactions_orig(unmatched_trans, unmatched_charges, args, progress=N
         if len(charges_same_id) > args.max_unmatched_charges_combinations:
             continue
 
-        combos = []
+        amounts = [c.transact_amount() for c in charges_same_id]
         for r in range(2, len(charges_same_id) + 1):
-            combos.extend(itertools.combinations(charges_same_id, r))
-        for c in combos:
-            charges_total = sum([charge.transact_amount() for charge in c])
-            amount_to_charges[charges_total].append(c)
+            # Walk the charges and their amounts in lockstep, so each total is
+            # a sum over a tuple of ints.
+            for combo, combo_amounts in zip(
+                itertools.combinations(charges_same_id, r),
+                itertools.combinations(amounts, r),
+            ):
+                charges_total = sum(combo_amounts)
+                if charges_total in trans_amounts:
+                    amount_to_charges[charges_total].append(combo)
 
     for t in unmatched_trans:
         mark_best_as_matched(t, amount_to_charges[t.amount], args, progress)
@@ -544,7 +659,7 @@ def match_transactions_orig_inverted(
         for r in range(2, len(charges_same_id) + 1):
             combos.extend(itertools.combinations(charges_same_id, r))
         for c in combos:
-            charges_total = sum([charge.transact_amount() for charge in c])
+            charges_total = sum(charge.transact_amount() for charge in c)
             amount_to_charges[charges_total].append(c)
 
     for t in unmatched_trans:
@@ -577,7 +692,7 @@ def match_transactions_all_combo_singles(
         if len(charges_same_id) == 1:
             continue
 
-        charges_total = sum([charge.transact_amount() for charge in charges_same_id])
+        charges_total = sum(charge.transact_amount() for charge in charges_same_id)
         amount_to_charges[charges_total].append(charges_same_id)
 
     for t in unmatched_trans:
@@ -604,7 +719,7 @@ def match_transactions_all_combo_singles(
         for r in range(2, len(charges_same_id)):
             combos.extend(itertools.combinations(charges_same_id, r))
         for c in combos:
-            charges_total = sum([charge.transact_amount() for charge in c])
+            charges_total = sum(charge.transact_amount() for charge in c)
             amount_to_charges[charges_total].append(c)
 
     for t in unmatched_trans:
@@ -659,7 +774,7 @@ def match_transactions_single_pass_multi_combos(
         for r in range(2, len(charges_same_id) + 1):
             combos.extend(itertools.combinations(charges_same_id, r))
         for c in combos:
-            charges_total = sum([charge.transact_amount() for charge in c])
+            charges_total = sum(charge.transact_amount() for charge in c)
             amount_to_charges[charges_total].append(c)
 
     for t in unmatched_trans:
@@ -684,7 +799,7 @@ def match_transactions_single_pass_all_combos(
         for r in range(1, len(charges_same_id) + 1):
             combos.extend(itertools.combinations(charges_same_id, r))
         for c in combos:
-            charges_total = sum([charge.transact_amount() for charge in c])
+            charges_total = sum(charge.transact_amount() for charge in c)
             amount_to_charges[charges_total].append(c)
 
     for t in unmatched_trans:
@@ -819,7 +934,7 @@ def match_transactions(unmatched_trans, unmatched_charges, args, progress=None):
         for r in range(2, len(charges_same_id) + 1):
             combos.extend(itertools.combinations(charges_same_id, r))
         for c in combos:
-            charges_total = sum([charge.transact_amount() for charge in c])
+            charges_total = sum(charge.transact_amount() for charge in c)
             amount_to_charges[charges_total].append(c)
 
     for t in unmatched_trans:
@@ -827,33 +942,37 @@ def match_transactions(unmatched_trans, unmatched_charges, args, progress=None):
 
 
 def print_dry_run(orig_trans_to_tagged, ignore_category=False):
+    # Format everything first and print once, rather than one write per line.
+    lines = []
     for orig_trans, new_trans in orig_trans_to_tagged:
         oid = orig_trans.charges[0].order_id()
         order_type = "Order" if orig_trans.amount < 0 else "Refund"
-        print(
+        lines.append(
             f"\nFor Amazon {order_type}: {oid}\n"
             f"Invoice URL: {amazon.get_invoice_url(oid)}"
         )
 
         if orig_trans.children:
             for i, trans in enumerate(orig_trans.children):
-                print(
+                lines.append(
                     "{}{}) Current: \t{}".format(
                         "\n" if i == 0 else "", i + 1, trans.dry_run_str()
                     )
                 )
         else:
-            print(f"\nCurrent: \t{orig_trans.dry_run_str()}")
+            lines.append(f"\nCurrent: \t{orig_trans.dry_run_str()}")
 
         if len(new_trans) == 1:
             trans = new_trans[0]
-            print(f"\nProposed: \t{trans.dry_run_str(ignore_category)}")
+            lines.append(f"\nProposed: \t{trans.dry_run_str(ignore_category)}")
         else:
             for i, trans in enumerate(reversed(new_trans)):
-                print(
+                lines.append(
                     "{}{}) Proposed: \t{}".format(
                         "\n" if i == 0 else "",
                         i + 1,
                         trans.dry_run_str(ignore_category),
                     )
                 )
+    if lines:
+        print("\n".join(lines))
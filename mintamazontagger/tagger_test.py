@@ -1,5 +1,9 @@
 from collections import Counter
+import multiprocessing
+import os
+import tempfile
 import unittest
+import zipfile
 
 from mintamazontagger import tagger
 from mintamazontagger.mockdata import MINT_CATEGORIES
@@ -14,7 +18,7 @@ def get_args(
         description_prefix_override='Amazon.com: ',
         description_return_prefix_override='Amazon.com: ',
         amazon_domains='amazon.com,amazon.co.uk',
-        mint_input_description_filter='amazon',
+        mint_input_description_filter=('amazon',),
         mint_input_include_user_description=False,
         mint_input_include_inferred_description=False,
         mint_input_categories_filter=None,
@@ -372,5 +376,46 @@ class Tagger(unittest.TestCase):
     #     self.assertEqual(len(updates), 1)
 
 
+def parse_in_main_process_only(export_zip, csv):
+    """Parses like parse_order_history_csv, but kills any worker process."""
+    if multiprocessing.parent_process():
+        os._exit(1)
+    return tagger.parse_order_history_csv(export_zip, csv)
+
+
+class ParseOrderHistoryCsvs(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        export_zip = os.path.join(self.tmp_dir.name, 'export.zip')
+        with zipfile.ZipFile(export_zip, 'w') as zip_file:
+            zip_file.writestr('a.csv', 'Order ID,Quantity\n1,2\n')
+            zip_file.writestr('b.csv', 'Order ID,Quantity\n3,4\n5,6\n')
+        self.order_history_csvs = [(export_zip, 'a.csv'), (export_zip, 'b.csv')]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def parse(self, parse, max_processes):
+        items = tagger.parse_order_history_csvs(
+            self.order_history_csvs, parse, max_processes)
+        return [(i.order_id, i.quantity) for i in items]
+
+    def test_parses_in_threads(self):
+        self.assertEqual(
+            self.parse(tagger.parse_order_history_csv, 0),
+            [('1', 2), ('3', 4), ('5', 6)])
+
+    def test_parses_in_processes(self):
+        self.assertEqual(
+            self.parse(tagger.parse_order_history_csv, 2),
+            [('1', 2), ('3', 4), ('5', 6)])
+
+    def test_falls_back_to_threads_when_a_process_dies(self):
+        with self.assertLogs(tagger.logger, 'WARNING'):
+            self.assertEqual(
+                self.parse(parse_in_main_process_only, 2),
+                [('1', 2), ('3', 4), ('5', 6)])
+
+
 if __name__ == '__main__':
     unittest.main()
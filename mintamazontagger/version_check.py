@@ -0,0 +1,107 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from mintamazontagger.args import TAGGER_BASE_PATH
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_NAME = 'mint-amazon-tagger'
+CACHE_PATH = os.path.join(TAGGER_BASE_PATH, 'outdated.json')
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+def check_outdated(package, version):
+    # outdated pulls in requests; only import it when PyPI must be asked.
+    from outdated import check_outdated
+    return check_outdated(package, version)
+
+
+def check_outdated_cached(version, cache_path=CACHE_PATH,
+                          ttl_seconds=CACHE_TTL_SECONDS):
+    """Like check_outdated, but only asks PyPI once per ttl_seconds.
+
+    Returns (is_outdated, latest_version). Raises ValueError if version is
+    newer than the latest PyPI version (same as check_outdated). A failed
+    check (e.g. offline) is treated as up to date. Every outcome is cached.
+    """
+    cached = _read_cache(cache_path, version, ttl_seconds)
+    if cached:
+        if cached['error'] is not None:
+            raise ValueError(cached['error'])
+        return cached['is_outdated'], cached['latest_version']
+
+    is_outdated, latest_version, error = False, None, None
+    try:
+        is_outdated, latest_version = check_outdated(PACKAGE_NAME, version)
+    except ValueError as e:
+        error = str(e)
+    except Exception as e:
+        logger.debug(f'Version check failed: {e}')
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w') as f:
+            json.dump({
+                'timestamp': time.time(),
+                'version': version,
+                'is_outdated': is_outdated,
+                'latest_version': latest_version,
+                'error': error,
+            }, f)
+    except OSError as e:
+        logger.debug(f'Unable to cache version check: {e}')
+    if error is not None:
+        raise ValueError(error)
+    return is_outdated, latest_version
+
+
+def _read_cache(cache_path, version, ttl_seconds):
+    """Returns the cached check of version if still fresh, otherwise None."""
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        # Caches written before errors were cached have no 'error'; refetch.
+        if (cached['version'] == version
+                and time.time() - cached['timestamp'] < ttl_seconds
+                and 'error' in cached):
+            return cached
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+class BackgroundVersionCheck():
+    """Runs check_outdated_cached on a daemon thread."""
+
+    def __init__(self, version):
+        self.version = version
+        self._result = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = check_outdated_cached(self.version)
+        except ValueError as e:
+            self._error = e
+        except Exception as e:
+            # Never let a failed version check (e.g. offline) stop the tool.
+            logger.debug(f'Version check failed: {e}')
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def result(self, timeout=0):
+        """Returns (is_outdated, latest_version), or None if not yet known.
+
+        Re-raises the ValueError from check_outdated, if any.
+        """
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            return None
+        if self._error:
+            raise self._error
+        return self._result
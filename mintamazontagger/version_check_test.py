@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from mintamazontagger import version_check
+
+
+class CheckOutdatedCached(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, 'outdated.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @mock.patch.object(version_check, 'check_outdated')
+    def test_uses_cache_within_ttl(self, check_outdated):
+        check_outdated.return_value = (True, '2.0')
+        self.assertEqual(
+            version_check.check_outdated_cached('1.0', self.cache_path),
+            (True, '2.0'))
+        self.assertEqual(
+            version_check.check_outdated_cached('1.0', self.cache_path),
+            (True, '2.0'))
+        self.assertEqual(check_outdated.call_count, 1)
+
+    @mock.patch.object(version_check, 'check_outdated')
+    def test_refetches_when_expired_or_version_changes(self, check_outdated):
+        check_outdated.return_value = (True, '2.0')
+        version_check.check_outdated_cached('1.0', self.cache_path)
+        version_check.check_outdated_cached('1.1', self.cache_path)
+        self.assertEqual(check_outdated.call_count, 2)
+        version_check.check_outdated_cached(
+            '1.1', self.cache_path, ttl_seconds=0)
+        self.assertEqual(check_outdated.call_count, 3)
+
+    @mock.patch.object(version_check, 'check_outdated')
+    def test_caches_newer_than_pypi(self, check_outdated):
+        check_outdated.side_effect = ValueError('Version 9.0 is newer')
+        for _ in range(2):
+            with self.assertRaisesRegex(ValueError, 'Version 9.0 is newer'):
+                version_check.check_outdated_cached('9.0', self.cache_path)
+        self.assertEqual(check_outdated.call_count, 1)
+
+    @mock.patch.object(version_check, 'check_outdated')
+    def test_caches_failed_check(self, check_outdated):
+        check_outdated.side_effect = OSError('Offline')
+        for _ in range(2):
+            self.assertEqual(
+                version_check.check_outdated_cached('1.0', self.cache_path),
+                (False, None))
+        self.assertEqual(check_outdated.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()